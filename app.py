@@ -1,17 +1,21 @@
 import streamlit as st
-import asyncio
 import logging
 import os
-import tempfile
 
 from utils.service_utils import create_service_sections, validate_service_content
-from utils.audio_utils import text_to_speech
-from utils.video_utils import create_slide, combine_slides_and_audio
-from services.unsplash_service import fetch_and_save_photo
-from services.gemini_service import generate_slides_from_raw
-from utils.avatar_utils import add_avatar_to_slide
+from utils.video_utils import (
+    DEFAULT_ENCODER_PROFILE,
+    combine_slides_and_audio,
+    encoder_profile_labels,
+    render_segmented_video,
+)
+from utils.pipeline import run_slide_pipeline
+from services.slide_generator import DEFAULT_BACKEND, backend_labels, get_slide_generator
+from services.slide_cache import slide_cache_stats
+from utils.image_cache import image_cache
 from utils.pdf_extractor import extract_raw_content
 from utils.pdf_utils import generate_service_pdf
+from utils.workspace import JobWorkspace
 
 logging.basicConfig(level=logging.INFO)
 
@@ -20,6 +24,11 @@ VOICES = {
     "en-IN-PrabhatNeural": "Prabhat (Male, Indian English)",
 }
 
+RENDER_MODES = {
+    "standard": "Standard (single pass)",
+    "segmented": "Segmented (one process per slide)",
+}
+
 
 # -------------------------------------------------
 # IMPROVED CSS STYLING
@@ -586,6 +595,31 @@ def main():
         )
         selected_voice = voice_keys[voice_index]
 
+        st.markdown("---")
+        st.markdown("### ⚙️ Rendering")
+        render_mode = st.selectbox(
+            "Render Mode:",
+            list(RENDER_MODES.keys()),
+            format_func=lambda k: RENDER_MODES[k],
+            help="Segmented mode encodes every slide on its own CPU core and joins them without re-encoding",
+        )
+        profiles = encoder_profile_labels()
+        encoder_profile = st.selectbox(
+            "Encoder Profile:",
+            list(profiles.keys()),
+            index=list(profiles.keys()).index(DEFAULT_ENCODER_PROFILE),
+            format_func=lambda k: profiles[k],
+            help="Draft encodes fastest at lower quality; Archive keeps the most detail",
+        )
+        backends = backend_labels()
+        slide_backend = st.selectbox(
+            "Slide Generator:",
+            list(backends.keys()),
+            index=list(backends.keys()).index(DEFAULT_BACKEND),
+            format_func=lambda k: backends[k],
+            help="The local generator builds slides from the form without any AI call",
+        )
+
         st.markdown("---")
         st.markdown("### 📄 Upload Options")
         st.caption("Upload a PDF to auto-generate content")
@@ -601,7 +635,9 @@ def main():
 
     # ---------------- ROUTING ----------------
     if page == "🎬 Create New Video":
-        show_create_video_page(selected_voice, uploaded_pdf)
+        show_create_video_page(
+            selected_voice, uploaded_pdf, render_mode, slide_backend, encoder_profile
+        )
     else:
         show_existing_videos_page()
 
@@ -609,7 +645,10 @@ def main():
 # -------------------------------------------------
 # CREATE VIDEO PAGE
 # -------------------------------------------------
-def show_create_video_page(selected_voice, uploaded_pdf):
+def show_create_video_page(
+    selected_voice, uploaded_pdf, render_mode="standard", slide_backend=None,
+    encoder_profile=None,
+):
     st.title("🎥 BSK Training Video Generator")
     st.markdown("**Create professional training videos for BSK data entry operators**")
     st.markdown("---")
@@ -689,13 +728,14 @@ def show_create_video_page(selected_voice, uploaded_pdf):
 
     # ---------------- GENERATION LOGIC ----------------
     if submitted:
+        workspace = None
+        slides_response = None
         try:
+            workspace = JobWorkspace("video")
+            generator = get_slide_generator(slide_backend)
             progress = st.progress(0, text="Initializing video generation...")
             status = st.empty()
 
-            video_clips = []
-            audio_paths = []
-
             # ==================================================
             # CASE 1: PDF EXISTS → IGNORE FORM
             # ==================================================
@@ -703,13 +743,15 @@ def show_create_video_page(selected_voice, uploaded_pdf):
                 with status.container():
                     st.markdown('<div class="status-box">📄 Extracting content from PDF (form data ignored)...</div>', unsafe_allow_html=True)
 
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                    tmp.write(uploaded_pdf.read())
-                    pdf_path = tmp.name
+                pdf_bytes = uploaded_pdf.read()
+                workspace.reserve(len(pdf_bytes))
+                pdf_path = workspace.new_file(".pdf", kind="upload")
+                with open(pdf_path, "wb") as tmp:
+                    tmp.write(pdf_bytes)
+                workspace.commit(pdf_path)
 
                 pages = extract_raw_content(pdf_path)
-                raw_text = "\n".join(line for page in pages for line in page["lines"])
-                
+
                 # Use PDF filename as service name
                 service_name = uploaded_pdf.name.replace(".pdf", "")
 
@@ -751,67 +793,72 @@ def show_create_video_page(selected_voice, uploaded_pdf):
                         use_container_width=True
                     )
 
-                # 2️⃣ Extract text from the saved PDF
-                pages = extract_raw_content(pdf_path)
-                raw_text = "\n".join(line for page in pages for line in page["lines"])
+                # 2️⃣ Local backend: slides straight from the form fields
+                if hasattr(generator, "generate_from_form"):
+                    slides_response = generator.generate_from_form(service_content)
+                else:
+                    # Extract text from the saved PDF
+                    pages = extract_raw_content(pdf_path)
 
             # ==================================================
-            # GEMINI → SLIDES (NEW API)
+            # BACKEND → SLIDES (STREAMED INTO THE PIPELINE)
             # ==================================================
-            with status.container():
-                st.markdown('<div class="status-box">🧠 Structuring training slides using AI...</div>', unsafe_allow_html=True)
-            
-            progress.progress(20, text="Processing content with AI...")
-            slides_response = generate_slides_from_raw(raw_text)
-            slides = slides_response["slides"]
+            if slides_response is None:
+                with status.container():
+                    st.markdown('<div class="status-box">🧠 Structuring training slides using AI...</div>', unsafe_allow_html=True)
 
-            st.info(f"✅ Generated {len(slides)} training slides")
+                progress.progress(20, text="Processing content with AI...")
+                # Long PDFs are chunked and map-reduced; slide 1 starts
+                # TTS / image fetch while later slides generate
+                slides = generator.stream_document(pages)
+            else:
+                slides = slides_response["slides"]
 
             # ==================================================
             # VIDEO PIPELINE
             # ==================================================
-            for i, slide in enumerate(slides):
+            def on_slide_ready(result, done, total):
                 with status.container():
-                    st.markdown(f'<div class="status-box">🎬 Creating slide {i + 1} of {len(slides)}: {slide["title"]}</div>', unsafe_allow_html=True)
-
-                progress.progress(int(20 + (i / len(slides) * 60)), text=f"Processing slide {i + 1}/{len(slides)}...")
-
-                narration = " ".join(slide["bullets"])
-                audio = asyncio.run(text_to_speech(narration, voice=selected_voice))
-                audio_paths.append(audio)
-
-                try:
-                    image = fetch_and_save_photo(slide["image_keyword"])
-                except Exception as img_error:
-                    logging.warning(f"Image fetch failed: {img_error}. Using fallback.")
-                    # Fallback to default image if fetch fails
-                    fallback = os.path.join("images", "fallback_video.jpg")
-                    if not os.path.exists(fallback):
-                        # Create a simple fallback if it doesn't exist
-                        try:
-                            from PIL import Image
-                            os.makedirs("images", exist_ok=True)
-                            img = Image.new("RGB", (1280, 720), (30, 30, 40))
-                            img.save(fallback, "JPEG", quality=90)
-                        except Exception:
-                            pass
-                    image = fallback if os.path.exists(fallback) else os.path.join("assets", "default_background.jpg")
-
-                clip = create_slide(slide["title"], slide["bullets"], image, audio)
-                clip = add_avatar_to_slide(clip, audio_duration=clip.duration)
-                video_clips.append(clip)
+                    st.markdown(f'<div class="status-box">🎬 Slide {done} of {total} ready: {result["title"]}</div>', unsafe_allow_html=True)
+
+                progress.progress(int(20 + (done / total * 60)), text=f"Rendered slide {done}/{total}...")
+
+            segmented = render_mode == "segmented"
+            rendered = run_slide_pipeline(
+                slides,
+                selected_voice,
+                compose=not segmented,
+                workspace=workspace,
+                on_slide_ready=on_slide_ready,
+            )
+            if not rendered:
+                st.error("❌ No slides could be generated from this content")
+                return
+
+            st.info(f"✅ Generated {len(rendered)} training slides")
 
             with status.container():
                 st.markdown('<div class="status-box">🎞️ Rendering final video...</div>', unsafe_allow_html=True)
             
             progress.progress(90, text="Finalizing video...")
-            final_path = combine_slides_and_audio(
-                video_clips, audio_paths, service_name=service_name or "BSK_Service"
-            )
+            if segmented:
+                final_path = render_segmented_video(
+                    rendered,
+                    service_name=service_name or "BSK_Service",
+                    workspace=workspace,
+                    profile=encoder_profile,
+                )
+            else:
+                final_path = combine_slides_and_audio(
+                    [r["clip"] for r in rendered],
+                    [r["tts"] for r in rendered],
+                    service_name=service_name or "BSK_Service",
+                    workspace=workspace,
+                    profile=encoder_profile,
+                )
 
             progress.progress(100, text="✅ Complete!")
             st.session_state["video_path"] = final_path
-            st.session_state["audio_paths"] = audio_paths
 
             status.empty()
             progress.empty()
@@ -824,6 +871,14 @@ def show_create_video_page(selected_voice, uploaded_pdf):
             st.error(f"❌ Error generating video: {str(e)}")
             st.error("Please check your inputs and try again.")
 
+        finally:
+            # Scratch files (uploads, narration, segments) never outlive the job
+            if workspace is not None:
+                logging.info(f"Job workspace metrics: {workspace.metrics()}")
+                workspace.cleanup()
+            logging.info(f"Slide cache: {slide_cache_stats()}")
+            logging.info(f"Image cache: {image_cache.stats()}")
+
     # ---------------- DISPLAY RESULT ----------------
     if "video_path" in st.session_state:
         st.markdown("---")
@@ -848,6 +903,17 @@ def show_create_video_page(selected_voice, uploaded_pdf):
                 st.session_state.clear()
                 st.rerun()
 
+        # Subtitle sidecar written alongside the video from TTS word timings
+        srt_path = os.path.splitext(st.session_state["video_path"])[0] + ".srt"
+        if os.path.exists(srt_path):
+            st.download_button(
+                "📝 Download Subtitles (SRT)",
+                data=open(srt_path, "rb").read(),
+                file_name=os.path.basename(srt_path),
+                mime="application/x-subrip",
+                use_container_width=True
+            )
+
 
 # -------------------------------------------------
 # EXISTING VIDEOS PAGE
@@ -0,0 +1,446 @@
+"""
+Offline benchmark / regression guard for the slide rendering pipeline.
+
+Builds a small reference deck from local assets (silent narration,
+plain background image) so it runs without API keys or network access.
+External HTTP APIs are exercised against local mock servers.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Budget per composed slide: the pre-rasterized slide + one avatar.
+# Slides are silent; narration is mixed once for the whole video from
+# the audio manifest, so composing a slide opens no decoder at all.
+MAX_LAYERS_PER_SLIDE = 2
+MAX_AUDIO_READERS_PER_SLIDE = 0
+
+REFERENCE_DECK = [
+    {
+        "title": "Service Overview",
+        "bullets": [
+            "Citizens apply at any Bangla Sahayta Kendra",
+            "Operators verify identity before data entry",
+            "Applications are tracked on the official portal",
+            "Acknowledgement slip is printed for every citizen",
+        ],
+        "seconds": 4,
+    },
+    {
+        "title": "Required Documents",
+        "bullets": [
+            "Aadhaar card of the applicant",
+            "Recent passport size photograph",
+            "Address proof issued within six months",
+            "Income certificate where applicable",
+            "Bank passbook first page",
+        ],
+        "seconds": 5,
+    },
+]
+
+
+def make_silent_mp3(path, seconds):
+    """Write a silent mono MP3 with the same format edge-tts produces."""
+    from moviepy.config import get_setting
+
+    subprocess.run(
+        [
+            get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", "anullsrc=r=24000:cl=mono",
+            "-t", str(seconds), "-b:a", "48k", path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def make_reference_assets(workdir):
+    """Create the audio/image files for REFERENCE_DECK."""
+    from PIL import Image
+    from utils.audio_utils import audio_entry_from_file
+
+    image_path = os.path.join(workdir, "reference.jpg")
+    Image.new("RGB", (1280, 720), (30, 30, 40)).save(image_path, "JPEG", quality=90)
+
+    specs = []
+    for i, slide in enumerate(REFERENCE_DECK):
+        audio_path = make_silent_mp3(
+            os.path.join(workdir, f"slide_{i}.mp3"), slide["seconds"]
+        )
+        specs.append(
+            {
+                "title": slide["title"],
+                "bullets": slide["bullets"],
+                "image": image_path,
+                "audio": audio_path,
+                "tts": audio_entry_from_file(audio_path),
+            }
+        )
+    return specs
+
+
+REFERENCE_FORM = {
+    "service_name": "Income Certificate",
+    "service_description": "Certificate of annual family income issued by the state.",
+    "how_to_apply": "1. Open the portal\n2. Fill the form\n3. Upload documents\n4. Submit",
+    "eligibility_criteria": "Permanent residents of West Bengal",
+    "required_docs": "• Aadhaar card\n• Address proof\n• Salary slip",
+    "operator_tips": "",
+    "troubleshooting": "",
+    "service_link": "",
+    "fees_and_timeline": "Fee: nil | Processing: 7 days",
+}
+
+
+def check_tts_cache(workdir):
+    """
+    Narration cache with a fake edge_tts.Communicate: a miss synthesizes
+    once and is written once (cache + hard link into the job), a hit
+    never touches the network and is linked into the job the same way.
+    """
+    import asyncio
+    from utils import audio_utils
+    from utils.disk_cache import DiskCache
+    from utils.workspace import JobWorkspace
+
+    with open(make_silent_mp3(os.path.join(workdir, "fake_tts.mp3"), 2), "rb") as f:
+        mp3_bytes = f.read()
+    calls = []
+
+    class FakeCommunicate:
+        def __init__(self, text, voice, rate, pitch, **kwargs):
+            calls.append(text)
+
+        async def stream(self):
+            yield {"type": "WordBoundary", "offset": 0, "duration": 5_000_000, "text": "Hello"}
+            yield {"type": "audio", "data": mp3_bytes}
+
+    errors = []
+    print("🔊 Checking TTS cache with a fake Communicate...")
+    saved = (audio_utils.edge_tts.Communicate, audio_utils.tts_cache, audio_utils.tts_meta_cache)
+    audio_utils.edge_tts.Communicate = FakeCommunicate
+    audio_utils.tts_cache = DiskCache(os.path.join(workdir, "tts"), 64 * 1024 * 1024, suffix=".mp3")
+    audio_utils.tts_meta_cache = DiskCache(os.path.join(workdir, "tts_meta"), 1024 * 1024, suffix=".json")
+    try:
+        with JobWorkspace("bench_tts", root=workdir) as workspace:
+            miss = asyncio.run(audio_utils.synthesize_narration("Hello operators", workspace=workspace))
+            start = time.perf_counter()
+            hit = asyncio.run(audio_utils.synthesize_narration("Hello operators", workspace=workspace))
+            hit_ms = (time.perf_counter() - start) * 1000
+
+            cached = audio_utils.tts_cache.path_for(
+                audio_utils.tts_cache_key(
+                    audio_utils.prepare_narration_text("Hello operators"),
+                    audio_utils.DEFAULT_VOICE, audio_utils.DEFAULT_RATE, audio_utils.DEFAULT_PITCH,
+                )
+            )
+            if len(calls) != 1:
+                errors.append(f"❌ TTS cache hit called Communicate ({len(calls)} syntheses)")
+            if not os.path.exists(cached) or not os.path.samefile(miss["path"], cached):
+                errors.append("❌ TTS miss was not written once into the cache")
+            if not hit["cached"] or hit["path"] == cached or not os.path.samefile(hit["path"], cached):
+                errors.append("❌ TTS cache hit was not linked into the job workspace")
+            if hit["words"] != miss["words"] or abs(hit["duration"] - miss["duration"]) > 1e-6:
+                errors.append("❌ TTS cache hit lost duration / word timings")
+        print(f"  syntheses={len(calls)} hit={hit_ms:.1f}ms")
+    finally:
+        audio_utils.edge_tts.Communicate, audio_utils.tts_cache, audio_utils.tts_meta_cache = saved
+
+    return errors
+
+
+def check_image_library(workdir):
+    """
+    Keyword → library image on a file-name-tagged library: plurals still
+    match, a shared head noun alone ("card", "death certificate") does not.
+    """
+    from services.image_library import ImageLibrary
+
+    directory = os.path.join(workdir, "library")
+    for name in ("birth_certificate.jpg", "ration_card.jpg",
+                 "health/hospital.jpg", "health/rural_hospital.jpg"):
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "wb").close()
+    library = ImageLibrary(directory)
+    expected = {
+        "hospitals": "health/hospital.jpg",
+        "ration card": "ration_card.jpg",
+        "birth certificate": "birth_certificate.jpg",
+        "death certificate": None,
+        "card": None,
+    }
+
+    errors = []
+    print("🗂️  Checking image library matching...")
+    for keyword, want in expected.items():
+        match = library.match(keyword)
+        got = os.path.relpath(match[0], directory).replace(os.sep, "/") if match else None
+        print(f"  {keyword!r} → {got} ({match[1]:.2f})" if match else f"  {keyword!r} → no match")
+        if got != want:
+            errors.append(f"❌ Library matched {keyword!r} to {got}, expected {want}")
+    return errors
+
+
+def check_local_slides():
+    """Time the offline slide generator (no API key needed)."""
+    from services.slide_generator import get_slide_generator
+
+    errors = []
+    print("🧠 Checking local slide generation...")
+    start = time.perf_counter()
+    slides = get_slide_generator("local").generate_from_form(REFERENCE_FORM)["slides"]
+    print(f"  {len(slides)} slides in {(time.perf_counter() - start) * 1000:.1f}ms")
+    if not slides:
+        errors.append("❌ Local slide generator produced no slides")
+    return errors
+
+
+class _MockUnsplash:
+    """
+    Local stand-in for the Unsplash search + image CDN (http.server thread).
+    Query "ratelimited" answers 429, "unauthorized" 401; "badheader"
+    sends a malformed X-Ratelimit-Remaining; "nothing" has no results.
+    """
+
+    def __init__(self, jpeg_bytes):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlparse
+
+        mock = self
+        self.searches = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type, headers=()):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.startswith("/photo/"):
+                    self._send(200, jpeg_bytes, "image/jpeg")
+                    return
+
+                query = parse_qs(url.query).get("query", [""])[0]
+                mock.searches.append(query)
+                if query == "ratelimited":
+                    self._send(429, b"{}", "application/json", [("Retry-After", "60")])
+                    return
+                if query == "unauthorized":
+                    self._send(401, b"{}", "application/json")
+                    return
+                results = [] if query == "nothing" else [{
+                    "id": f"id-{query}",
+                    "urls": {
+                        "raw": f"{mock.url}/photo/{query}?ixid=1",
+                        "regular": f"{mock.url}/photo/{query}",
+                    },
+                    "user": {"name": "Mock"},
+                }]
+                headers = [("X-Ratelimit-Remaining", "abc" if query == "badheader" else "40")]
+                self._send(200, json.dumps({"results": results}).encode(), "application/json", headers)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def check_unsplash_client(workdir):
+    """
+    Unsplash client against a local mock server: concurrent prefetch with
+    keyword dedup, cache hits without requests, sized derivatives,
+    negative caching of dead keywords only, rate-limit handling and
+    malformed headers.
+    """
+    import io
+    from PIL import Image
+
+    os.environ.setdefault("UNSPLASH_ACCESS_KEY", "benchmark")
+    from services import unsplash_service
+    from utils.image_cache import ImageCache
+
+    errors = []
+    print("🖼️ Checking Unsplash client against a mock server...")
+    jpeg = io.BytesIO()
+    Image.new("RGB", (660, 440), (40, 120, 200)).save(jpeg, "JPEG")
+    mock = _MockUnsplash(jpeg.getvalue())
+
+    images_dir = os.path.join(workdir, "images")
+    os.makedirs(images_dir, exist_ok=True)
+    saved = {
+        name: getattr(unsplash_service, name)
+        for name in ("UNSPLASH_URL", "IMAGES_DIR", "IMAGE_SOURCE", "image_cache", "_blocked_until")
+    }
+    unsplash_service.UNSPLASH_URL = f"{mock.url}/search"
+    unsplash_service.IMAGES_DIR = images_dir
+    unsplash_service.IMAGE_SOURCE = "unsplash"
+    unsplash_service.image_cache = ImageCache(
+        images_dir, os.path.join(workdir, "images.sqlite3"), 64 * 1024 * 1024, 3600
+    )
+    size = (330, 220)
+    try:
+        start = time.perf_counter()
+        paths = unsplash_service.prefetch_photos(["Hospital", "hospital ", "School"], size=size)
+        prefetch_ms = (time.perf_counter() - start) * 1000
+        if sorted(mock.searches) != ["hospital", "school"]:
+            errors.append(f"❌ Prefetch searched {mock.searches}, expected one search per keyword")
+        for keyword, path in paths.items():
+            with Image.open(path) as img:
+                if img.size != size:
+                    errors.append(f"❌ '{keyword}' image is {img.size}, expected {size}")
+
+        searches = len(mock.searches)
+        unsplash_service.fetch_and_save_photo("hospital", size=size)
+        if len(mock.searches) != searches:
+            errors.append("❌ Cached keyword searched Unsplash again")
+
+        if unsplash_service.fetch_and_save_photo("badheader", size=size) == unsplash_service.FALLBACK_IMAGE:
+            errors.append("❌ Malformed X-Ratelimit-Remaining header broke the fetch")
+
+        for keyword, expected in (("nothing", "failed"), ("unauthorized", "miss")):
+            unsplash_service.fetch_and_save_photo(keyword, size=size)
+            status, _ = unsplash_service.image_cache.lookup(
+                unsplash_service.cache_key(keyword, size)
+            )
+            if status != expected:
+                errors.append(f"❌ '{keyword}' left a '{status}' cache entry, expected '{expected}'")
+
+        fallback = unsplash_service.fetch_and_save_photo("ratelimited", size=size)
+        searches = len(mock.searches)
+        unsplash_service.fetch_and_save_photo("after limit", size=size)
+        if fallback != unsplash_service.FALLBACK_IMAGE or len(mock.searches) != searches:
+            errors.append("❌ 429 did not pause Unsplash requests")
+        status, _ = unsplash_service.image_cache.lookup(unsplash_service.cache_key("ratelimited", size))
+        if status != "miss":
+            errors.append("❌ Rate-limited keyword was negatively cached")
+        print(f"  prefetch of 3 keywords: {prefetch_ms:.0f}ms, {len(mock.searches)} searches in total")
+    finally:
+        for name, value in saved.items():
+            setattr(unsplash_service, name, value)
+        mock.close()
+
+    return errors
+
+
+def check_composition(specs):
+    """Fail if slides composite more layers / open more decoders than budgeted."""
+    from utils.video_utils import create_slide, slide_composition_stats
+
+    errors = []
+    print("🧱 Checking per-slide composition...")
+    for spec in specs:
+        start = time.perf_counter()
+        clip = create_slide(spec["title"], spec["bullets"], spec["image"], spec["tts"])
+        build_s = time.perf_counter() - start
+
+        stats = slide_composition_stats(clip)
+
+        start = time.perf_counter()
+        frames = 0
+        t = 0.0
+        while t < clip.duration:
+            clip.get_frame(t)
+            frames += 1
+            t += 1 / 30
+        frame_ms = (time.perf_counter() - start) / frames * 1000
+        # Frames actually composited (the rest repeat a static frame)
+        frame_stats = getattr(clip, "frame_stats", None)
+        composited = frame_stats["composited"] if frame_stats else frames
+
+        print(
+            f"  {spec['title']}: layers={stats['layers']} "
+            f"audio_readers={stats['audio_readers']} "
+            f"build={build_s:.2f}s frame={frame_ms:.1f}ms "
+            f"composited={composited}/{frames}"
+        )
+
+        if stats["layers"] > MAX_LAYERS_PER_SLIDE:
+            errors.append(
+                f"❌ {spec['title']}: {stats['layers']} composited layers "
+                f"(max {MAX_LAYERS_PER_SLIDE})"
+            )
+        if stats["audio_readers"] > MAX_AUDIO_READERS_PER_SLIDE:
+            errors.append(
+                f"❌ {spec['title']}: {stats['audio_readers']} audio readers "
+                f"(max {MAX_AUDIO_READERS_PER_SLIDE})"
+            )
+        clip.close()
+
+    return errors
+
+
+def report_encoder_profiles(specs, workdir):
+    """Encode the reference deck once per profile: encode time + file size."""
+    from utils.video_utils import ENCODER_PROFILES, combine_slides_and_audio, create_slide
+
+    errors = []
+    print("🎞️ Encoding reference deck per encoder profile...")
+    for name, profile in ENCODER_PROFILES.items():
+        clips = [
+            create_slide(spec["title"], spec["bullets"], spec["image"], spec["tts"])
+            for spec in specs
+        ]
+        output_path = os.path.join(workdir, f"profile_{name}.mp4")
+        start = time.perf_counter()
+        try:
+            combine_slides_and_audio(
+                clips, [spec["tts"] for spec in specs], profile=name, output_path=output_path
+            )
+        except Exception as e:
+            errors.append(f"❌ Encoder profile {name} failed: {e}")
+            continue
+        finally:
+            for clip in clips:
+                clip.close()
+        encode_s = time.perf_counter() - start
+
+        print(
+            f"  {name}: crf={profile['crf']} preset={profile['preset']} "
+            f"fps={profile['fps']} encode={encode_s:.2f}s "
+            f"size={os.path.getsize(output_path) / 1024:.0f}KB"
+        )
+
+    return errors
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="bsk_bench_") as workdir:
+        specs = make_reference_assets(workdir)
+        errors = check_local_slides()
+        errors += check_tts_cache(workdir)
+        errors += check_image_library(workdir)
+        errors += check_unsplash_client(workdir)
+        errors += check_composition(specs)
+        errors += report_encoder_profiles(specs, workdir)
+
+    print("\n" + "=" * 50)
+    if errors:
+        for error in errors:
+            print(f"  {error}")
+        return False
+
+    print("✅ Composition budget respected")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
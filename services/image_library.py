@@ -0,0 +1,200 @@
+"""
+Local image library: approved, keyword-tagged images served offline
+
+Goals:
+- Slide image keywords matched against library tags without the network
+- Character n-gram TF-IDF, so "hospitals" finds "hospital" and small
+  spelling differences still match
+- A multi-word tag also needs one of its modifiers in the keyword: the
+  shared head noun alone ("death certificate" vs "birth certificate",
+  "card" vs "ration card") names a different thing
+- Index built once per process; a lookup touches only the postings of
+  the query's own n-grams
+
+Layout:
+    assets/image_library/
+        tags.json            {"ration_card.jpg": ["ration card", "food supply"], ...}
+        ration_card.jpg
+        health/hospital.jpg  untagged files are tagged by file name, and
+                             by folder + file name
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+
+LIBRARY_DIR = os.getenv("BSK_IMAGE_LIBRARY_DIR", os.path.join("assets", "image_library"))
+TAGS_FILE = "tags.json"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+NGRAM = 3
+# Cosine similarity a keyword needs before a library image is used
+MIN_SCORE = float(os.getenv("BSK_IMAGE_LIBRARY_MIN_SCORE", "0.45"))
+# Trigram overlap (Dice) at which two words count as the same word
+# ("hospitals" / "hospital")
+SAME_WORD = 0.6
+
+
+# -------------------------------------------------
+# FEATURES
+# -------------------------------------------------
+def tokenize(text: str):
+    return re.findall(r"[a-z0-9]+", text.lower().replace("&", " and "))
+
+
+def features(text: str) -> dict:
+    """Word + padded character n-gram counts of a phrase."""
+    counts = {}
+    for word in tokenize(text):
+        counts[f"w:{word}"] = counts.get(f"w:{word}", 0) + 1
+        padded = f" {word} "
+        for i in range(max(1, len(padded) - NGRAM + 1)):
+            gram = padded[i:i + NGRAM]
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def _ngrams(word: str):
+    padded = f" {word} "
+    return {padded[i:i + NGRAM] for i in range(max(1, len(padded) - NGRAM + 1))}
+
+
+def same_word(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    grams_a, grams_b = _ngrams(a), _ngrams(b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b)) >= SAME_WORD
+
+
+def _tags_from_name(relative_path: str):
+    """'health/rural_hospital.jpg' → ['rural hospital', 'health rural hospital']."""
+    parts = re.split(r"[\\/]+", os.path.splitext(relative_path)[0])
+    name = " ".join(re.split(r"[_\-\s]+", parts[-1]))
+    if len(parts) == 1:
+        return [name]
+    return [name, " ".join(re.split(r"[\\/_\-\s]+", "/".join(parts)))]
+
+
+# -------------------------------------------------
+# INDEX
+# -------------------------------------------------
+class ImageLibrary:
+    """
+    One TF-IDF document per tag phrase; an image scores as its best tag
+    that the keyword shares a modifier with (every word but the last),
+    or any single-word tag.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._built = False
+        self._images = []  # image paths
+        self._tag_image = []  # tag id → image id
+        self._tag_modifiers = []  # tag id → words before the head noun
+        self._postings = {}  # feature → [(tag id, weight)]
+        self._idf = {}
+
+    def _load_tags(self):
+        """{image path: [tags]} from tags.json plus every untagged image file."""
+        manifest = {}
+        tags_path = os.path.join(self.directory, TAGS_FILE)
+        if os.path.exists(tags_path):
+            with open(tags_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+        tagged = {}
+        for root, _, files in os.walk(self.directory):
+            for name in sorted(files):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                tags = manifest.get(relative) or _tags_from_name(relative)
+                tagged[path] = [tags] if isinstance(tags, str) else list(tags)
+        return tagged
+
+    def build(self):
+        """(Re)build the index from the library folder."""
+        tagged = self._load_tags() if os.path.isdir(self.directory) else {}
+
+        images, tag_image, tag_modifiers, tag_features = [], [], [], []
+        for path, tags in tagged.items():
+            images.append(path)
+            for tag in tags:
+                counts = features(tag)
+                if counts:
+                    tag_image.append(len(images) - 1)
+                    tag_modifiers.append(tuple(tokenize(tag)[:-1]))
+                    tag_features.append(counts)
+
+        document_freq = {}
+        for counts in tag_features:
+            for feature in counts:
+                document_freq[feature] = document_freq.get(feature, 0) + 1
+        n = len(tag_features)
+        idf = {f: math.log((1 + n) / (1 + df)) + 1 for f, df in document_freq.items()}
+
+        postings = {}
+        for tag_id, counts in enumerate(tag_features):
+            weights = {f: c * idf[f] for f, c in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            for feature, weight in weights.items():
+                postings.setdefault(feature, []).append((tag_id, weight / norm))
+
+        with self._lock:
+            self._images = images
+            self._tag_image = tag_image
+            self._tag_modifiers = tag_modifiers
+            self._postings = postings
+            self._idf = idf
+            self._built = True
+        logging.info(
+            f"[Library] Indexed {len(images)} images, {n} tags from {self.directory}"
+        )
+
+    def _ensure_built(self):
+        if not self._built:
+            with self._lock:
+                built = self._built
+            if not built:
+                self.build()
+
+    def __len__(self):
+        self._ensure_built()
+        return len(self._images)
+
+    def match(self, keyword: str, min_score: float = MIN_SCORE):
+        """(image path, score) of the best-matching image, or None."""
+        self._ensure_built()
+        counts = features(keyword or "")
+        weights = {f: c * self._idf[f] for f, c in counts.items() if f in self._idf}
+        if not weights:
+            return None
+        # Features no tag has still count towards the query norm (at the
+        # idf of a feature seen in zero tags)
+        unseen_idf = math.log(1 + len(self._tag_image)) + 1
+        norm = math.sqrt(
+            sum(w * w for w in weights.values())
+            + sum((c * unseen_idf) ** 2 for f, c in counts.items() if f not in self._idf)
+        )
+
+        scores = {}
+        for feature, weight in weights.items():
+            for tag_id, tag_weight in self._postings[feature]:
+                scores[tag_id] = scores.get(tag_id, 0.0) + weight * tag_weight
+
+        words = tokenize(keyword)
+        for tag_id, score in sorted(scores.items(), key=lambda item: -item[1]):
+            score /= norm
+            if score < min_score:
+                return None
+            modifiers = self._tag_modifiers[tag_id]
+            if not modifiers or any(same_word(w, m) for w in words for m in modifiers):
+                return self._images[self._tag_image[tag_id]], score
+        return None
+
+
+image_library = ImageLibrary(LIBRARY_DIR)
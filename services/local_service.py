@@ -0,0 +1,114 @@
+"""
+Local slide generator (no network, deterministic)
+RAW text / form content → SLIDES via utils.service_utils
+
+Used for:
+- Zero-latency slides straight from the form
+- Offline runs and end-to-end pipeline benchmarks
+"""
+
+import re
+
+from services.slide_generator import SlideGenerator
+from utils.service_utils import create_service_sections
+
+MAX_BULLETS = 6
+MAX_BULLET_WORDS = 12
+
+# Section headings written by utils.pdf_utils.generate_service_pdf
+PDF_HEADINGS = {
+    "Service Name": "service_name",
+    "Service Description": "service_description",
+    "How to Apply": "how_to_apply",
+    "Eligibility Criteria": "eligibility_criteria",
+    "Required Documents": "required_docs",
+    "Operator Tips": "operator_tips",
+    "Troubleshooting": "troubleshooting",
+    "Fees & Timeline": "fees_and_timeline",
+}
+PDF_PREAMBLE = ("BSK Training Service Document", "Generated on:")
+
+_BULLET_SPLIT = re.compile(r"\n|(?<=[.!?])\s+|;\s*|\s\|\s|\s[•·]\s*")
+_BULLET_MARKER = re.compile(r"^\s*(?:[•·\-*]|\d+[.)])\s*")
+
+
+# -------------------------------------------------
+# TEXT → SERVICE CONTENT
+# -------------------------------------------------
+def parse_service_document(raw_text: str):
+    """
+    Rebuild the form fields from a PDF made by generate_service_pdf.
+    Text without those headings becomes the service description.
+    """
+    content = {key: "" for key in PDF_HEADINGS.values()}
+    content["service_link"] = ""
+
+    current = None
+    lines = {key: [] for key in PDF_HEADINGS.values()}
+    loose = []
+    for line in raw_text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(PDF_PREAMBLE):
+            continue
+        if line in PDF_HEADINGS:
+            current = PDF_HEADINGS[line]
+        elif current:
+            lines[current].append(line)
+        else:
+            loose.append(line)
+
+    for key, values in lines.items():
+        content[key] = "\n".join(values)
+    if not content["service_description"]:
+        content["service_description"] = "\n".join(loose)
+    if not content["service_name"]:
+        content["service_name"] = "this service"
+    return content
+
+
+# -------------------------------------------------
+# SECTIONS → SLIDES
+# -------------------------------------------------
+def split_bullets(text: str):
+    # The first colon ends the section's lead-in sentence
+    text = re.sub(r":\s+", "\n", text, count=1)
+    bullets = []
+    for part in _BULLET_SPLIT.split(text):
+        part = _BULLET_MARKER.sub("", part).strip().rstrip(".")
+        if not part:
+            continue
+        words = part.split()
+        bullets.append(" ".join(words[:MAX_BULLET_WORDS]))
+        if len(bullets) == MAX_BULLETS:
+            break
+    return bullets
+
+
+def slides_from_service_content(service_content):
+    slides = []
+    for title, text, keyword in create_service_sections(service_content):
+        bullets = split_bullets(text)
+        if bullets:
+            slides.append(
+                {
+                    "slide_no": len(slides) + 1,
+                    "title": title,
+                    "bullets": bullets,
+                    "image_keyword": keyword,
+                }
+            )
+    return {"slides": slides}
+
+
+class LocalSlideGenerator(SlideGenerator):
+    name = "local"
+    model_name = "rule-based"
+    cacheable = False  # cheaper than a cache lookup
+    chunk_chars = None  # whole document in one pass
+
+    def _stream_slides(self, raw_text: str):
+        yield from slides_from_service_content(parse_service_document(raw_text))["slides"]
+
+    def generate_from_form(self, service_content):
+        """Skip the PDF round trip when the form fields are at hand."""
+        return slides_from_service_content(service_content)
@@ -0,0 +1,65 @@
+"""
+Persistent slide-JSON cache shared by the LLM slide generators
+
+Goals:
+- Re-uploading the same PDF never calls the LLM again
+- Keyed on (normalized raw text hash, model name, prompt version)
+- TTL + size-bounded eviction, hit/miss counters, opt-in bypass
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from utils.disk_cache import DiskCache, make_key
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+SLIDE_CACHE_DIR = os.path.join("cache", "slides")
+SLIDE_CACHE_MAX_MB = int(os.getenv("BSK_SLIDE_CACHE_MB", "64"))
+SLIDE_CACHE_TTL_HOURS = float(os.getenv("BSK_SLIDE_CACHE_TTL_HOURS", "168"))
+# Set BSK_SLIDE_CACHE_BYPASS=1 to always call the LLM (results are still stored)
+SLIDE_CACHE_BYPASS = os.getenv("BSK_SLIDE_CACHE_BYPASS", "") == "1"
+
+slide_cache = DiskCache(
+    SLIDE_CACHE_DIR,
+    SLIDE_CACHE_MAX_MB * 1024 * 1024,
+    suffix=".json",
+    ttl=SLIDE_CACHE_TTL_HOURS * 3600,
+)
+
+
+def normalize_raw_text(raw_text: str) -> str:
+    """Collapse whitespace so re-extractions of the same PDF hash equally."""
+    return " ".join(raw_text.split())
+
+
+def slide_cache_key(raw_text: str, model_name: str, prompt_version: int) -> str:
+    text_hash = hashlib.sha256(normalize_raw_text(raw_text).encode("utf-8")).hexdigest()
+    return make_key("slides-v1", text_hash, model_name, prompt_version)
+
+
+def load_cached_slides(raw_text, model_name, prompt_version):
+    """Cached slide JSON for this text / model / prompt version, or None."""
+    key = slide_cache_key(raw_text, model_name, prompt_version)
+    path = slide_cache.get(key)
+    if not path:
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None  # evicted or corrupt: regenerate
+    logging.info(f"[Slides] Cache hit for {model_name} ({key[:12]})")
+    return data
+
+
+def store_cached_slides(raw_text, model_name, prompt_version, data):
+    key = slide_cache_key(raw_text, model_name, prompt_version)
+    slide_cache.put_bytes(key, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def slide_cache_stats():
+    return slide_cache.stats()
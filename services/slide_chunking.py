@@ -0,0 +1,128 @@
+"""
+Chunking + merging for long documents (map-reduce slide generation)
+
+Goals:
+- Split extracted pages into prompt-sized chunks at page / heading breaks
+- Merge per-chunk topic notes, dropping duplicate facts
+- Keep the final slide prompt bounded, however long the PDF is
+"""
+
+import json
+import os
+import re
+
+from services.slide_prompt import MAX_FACTS_PER_TOPIC, TOPICS
+
+CHUNK_CHARS = int(os.getenv("BSK_SLIDE_CHUNK_CHARS", "12000"))
+MAP_WORKERS = 4  # parallel chunk requests
+
+_NUMBERED = re.compile(r"^(\d+(\.\d+)*[.)]?|[IVX]+\.|[A-Z]\.)\s+\S")
+
+
+# -------------------------------------------------
+# SPLITTING
+# -------------------------------------------------
+def is_heading(line: str) -> bool:
+    """Short, unpunctuated line that looks like a section title."""
+    words = line.split()
+    if not words or len(words) > 8 or line.endswith((".", ",", ";")):
+        return False
+    return line.isupper() or line.istitle() or bool(_NUMBERED.match(line))
+
+
+def split_sections(lines):
+    sections = [[]]
+    for line in lines:
+        if is_heading(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return sections
+
+
+def _split_oversized(lines, max_chars):
+    """Pieces of at most ~max_chars, cut at headings first, then at lines."""
+    pieces = []
+    for section in split_sections(lines):
+        current, size = [], 0
+        for line in section:
+            if current and size + len(line) + 1 > max_chars:
+                pieces.append("\n".join(current))
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+        if current:
+            pieces.append("\n".join(current))
+    return pieces
+
+
+def pages_text(pages) -> str:
+    return "\n".join(line for page in pages for line in page["lines"])
+
+
+def chunk_pages(pages, max_chars=CHUNK_CHARS):
+    """
+    Pack whole pages into chunks of at most ~max_chars.
+    A page that alone is too big is split at its section headings.
+    """
+    units = []
+    for page in pages:
+        text = "\n".join(page["lines"])
+        if len(text) <= max_chars:
+            units.append(text)
+        else:
+            units.extend(_split_oversized(page["lines"], max_chars))
+
+    chunks, current, size = [], [], 0
+    for unit in units:
+        if current and size + len(unit) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += len(unit) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+# -------------------------------------------------
+# MERGING
+# -------------------------------------------------
+def parse_notes(text: str):
+    """{"topics": [{"topic", "facts"}]} response → {topic: [facts]}."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("No JSON found in notes response")
+    data = json.loads(text[start:end + 1])
+
+    notes = {}
+    for item in data.get("topics") or []:
+        topic = item.get("topic")
+        if topic in TOPICS:
+            notes.setdefault(topic, []).extend(
+                str(fact).strip() for fact in item.get("facts") or [] if str(fact).strip()
+            )
+    return notes
+
+
+def _fact_key(fact: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", fact.lower()))
+
+
+def merge_notes(chunk_notes):
+    """
+    Merge per-chunk notes into the fixed topic slots (in TOPICS order).
+    Duplicate facts are dropped; each topic keeps MAX_FACTS_PER_TOPIC.
+    """
+    merged = {}
+    for topic in TOPICS:
+        seen = set()
+        facts = []
+        for notes in chunk_notes:
+            for fact in notes.get(topic, []):
+                key = _fact_key(fact)
+                if key and key not in seen:
+                    seen.add(key)
+                    facts.append(fact)
+        if facts:
+            merged[topic] = facts[:MAX_FACTS_PER_TOPIC]
+    return merged
@@ -0,0 +1,160 @@
+"""
+Slide-generation backends
+RAW text → slide JSON, behind one interface
+
+Goals:
+- One SlideGenerator interface for every backend
+- Registry imports a backend (and builds its client) only when first used,
+  so a missing API key or SDK only matters for the backend you pick
+- Every LLM backend goes through the persistent slide cache
+- Slides are yielded one by one as the response streams in
+- Long documents are map-reduced: chunk notes in parallel, then one
+  bounded slide prompt
+"""
+
+import importlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.slide_cache import (
+    SLIDE_CACHE_BYPASS, load_cached_slides, store_cached_slides,
+)
+from services.slide_chunking import (
+    CHUNK_CHARS, MAP_WORKERS, chunk_pages, merge_notes, pages_text, parse_notes,
+)
+from services.slide_prompt import (
+    NOTES_SCHEMA, PROMPT_VERSION, SLIDE_SCHEMA, SlideStreamParser,
+    build_notes_prompt, build_prompt, format_notes,
+)
+
+# name → (module, class, label)
+SLIDE_BACKENDS = {
+    "gemini": ("services.gemini_service", "GeminiSlideGenerator", "Google Gemini"),
+    "openai": ("services.openai_service", "OpenAISlideGenerator", "OpenAI"),
+    "local": ("services.local_service", "LocalSlideGenerator", "Local (offline, rule-based)"),
+}
+DEFAULT_BACKEND = os.getenv("BSK_SLIDE_BACKEND", "gemini")
+if DEFAULT_BACKEND not in SLIDE_BACKENDS:
+    logging.warning(
+        f"[Slides] Unknown BSK_SLIDE_BACKEND {DEFAULT_BACKEND!r}, "
+        f"using 'gemini' (choices: {', '.join(SLIDE_BACKENDS)})"
+    )
+    DEFAULT_BACKEND = "gemini"
+
+_generators = {}
+_registry_lock = threading.Lock()
+
+
+class SlideGenerator:
+    """
+    Base class for slide backends.
+
+    LLM backends implement _stream_text(prompt, schema), yielding the
+    response text in chunks. Other backends override _stream_slides.
+    Every slide is {"slide_no", "title", "bullets", "image_keyword"}.
+    """
+
+    name = ""
+    model_name = ""
+    prompt_version = PROMPT_VERSION
+    cacheable = True  # False for backends cheaper than a cache lookup
+    chunk_chars = CHUNK_CHARS  # None: never map-reduce
+
+    def stream_document(self, pages, bypass_cache: bool = None):
+        """
+        Like stream(), for extract_raw_content() pages.
+
+        Documents longer than one chunk are map-reduced: every chunk is
+        condensed into per-topic notes in parallel, the notes are merged
+        and deduplicated, and only the merged notes go into the final
+        slide prompt (bounded by MAX_FACTS_PER_TOPIC per topic).
+        """
+        chunks = chunk_pages(pages, self.chunk_chars) if self.chunk_chars else []
+        if len(chunks) <= 1:
+            yield from self.stream(pages_text(pages), bypass_cache)
+            return
+
+        with ThreadPoolExecutor(min(MAP_WORKERS, len(chunks))) as pool:
+            chunk_notes = list(
+                pool.map(lambda chunk: self.summarize_chunk(chunk, bypass_cache), chunks)
+            )
+        notes_text = format_notes(merge_notes(chunk_notes))
+        logging.info(
+            f"[Slides] Map-reduce: {len(chunks)} chunks, "
+            f"{sum(len(c) for c in chunks)} chars → {len(notes_text)} chars of notes"
+        )
+        yield from self.stream(notes_text, bypass_cache)
+
+    def summarize_chunk(self, chunk: str, bypass_cache: bool = None):
+        """Map stage: one chunk → {topic: [facts]} (cached like slides)."""
+        if bypass_cache is None:
+            bypass_cache = SLIDE_CACHE_BYPASS
+        version = f"notes-{self.prompt_version}"
+
+        if not bypass_cache:
+            cached = load_cached_slides(chunk, self.model_name, version)
+            if cached is not None:
+                return cached
+
+        notes = parse_notes("".join(self._stream_text(build_notes_prompt(chunk), NOTES_SCHEMA)))
+        store_cached_slides(chunk, self.model_name, version, notes)
+        return notes
+
+    def stream(self, raw_text: str, bypass_cache: bool = None):
+        """
+        Yield validated slides as soon as each one is complete.
+        A cache hit yields the whole deck at once; a finished miss is stored.
+        """
+        if bypass_cache is None:
+            bypass_cache = SLIDE_CACHE_BYPASS
+
+        if self.cacheable and not bypass_cache:
+            cached = load_cached_slides(raw_text, self.model_name, self.prompt_version)
+            if cached:
+                yield from cached["slides"]
+                return
+
+        slides = []
+        for slide in self._stream_slides(raw_text):
+            slide["slide_no"] = len(slides) + 1
+            slides.append(slide)
+            yield slide
+
+        if not slides:
+            raise ValueError(f"Invalid slide output from {self.name}: no usable slides")
+        if self.cacheable:
+            store_cached_slides(
+                raw_text, self.model_name, self.prompt_version, {"slides": slides}
+            )
+
+    def generate(self, raw_text: str, bypass_cache: bool = None):
+        return {"slides": list(self.stream(raw_text, bypass_cache))}
+
+    def _stream_slides(self, raw_text: str):
+        parser = SlideStreamParser(source=self.name)
+        for chunk in self._stream_text(build_prompt(raw_text), SLIDE_SCHEMA):
+            yield from parser.feed(chunk)
+        parser.close()
+
+    def _stream_text(self, prompt: str, schema):
+        raise NotImplementedError
+
+
+def get_slide_generator(name: str = None) -> SlideGenerator:
+    """Shared generator instance for `name` (imported on first use)."""
+    name = name or DEFAULT_BACKEND
+    if name not in SLIDE_BACKENDS:
+        raise ValueError(f"Unknown slide backend: {name}")
+
+    with _registry_lock:
+        if name not in _generators:
+            module_name, class_name, _ = SLIDE_BACKENDS[name]
+            module = importlib.import_module(module_name)
+            _generators[name] = getattr(module, class_name)()
+        return _generators[name]
+
+
+def backend_labels():
+    return {name: label for name, (_, _, label) in SLIDE_BACKENDS.items()}
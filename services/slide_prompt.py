@@ -0,0 +1,272 @@
+"""
+Prompt + response handling shared by the LLM slide generators
+RAW PDF text → CLEAN SLIDES (STRICT FORMAT)
+"""
+
+import json
+import logging
+
+# Bump whenever the prompt changes: cached slides are keyed on it
+PROMPT_VERSION = 2
+
+# Fixed slide topics, in presentation order
+TOPICS = [
+    "Service Overview",
+    "Application Process",
+    "Required Documents",
+    "Eligibility Criteria",
+    "Important Guidelines",
+    "Fees & Timeline",
+    "Tips for DEO Operators",
+    "Common Troubleshooting",
+    "Online Service Access",
+    "Thank You / Conclusion",
+]
+
+SYSTEM_PROMPT = "You are a strict JSON generator. Output JSON only."
+
+
+# -------------------------------------------------
+# PROMPT (STRICT OUTPUT CONTROL)
+# -------------------------------------------------
+def build_prompt(raw_text: str) -> str:
+    topics = "\n".join(f"  {i}. {topic}" for i, topic in enumerate(TOPICS, start=1))
+    return f"""
+You are creating PowerPoint slides for a government training video.
+
+TASK:
+From the RAW TEXT below, create CLEAN, TRAINING-READY slides.
+
+STRICT RULES (MANDATORY):
+- Use ONLY information from the text
+- Do NOT invent or assume information
+- Generate ONLY the following slides if content exists:
+{topics}
+- ONE slide per topic (DO NOT split)
+- Skip a slide if no information exists
+- Compress long procedures into concise bullets
+
+SLIDE RULES:
+- Title: max 6 words (use topic name)
+- Bullets: 4–6 bullets, max 12 words each
+- Image keyword: exactly 2–3 words
+
+OUTPUT FORMAT (JSON ONLY — EXACT):
+{{
+  "slides": [
+    {{
+      "slide_no": 1,
+      "title": "",
+      "bullets": [],
+      "image_keyword": ""
+    }}
+  ]
+}}
+
+RAW TEXT:
+{raw_text}
+"""
+
+
+# -------------------------------------------------
+# MAP STAGE PROMPT (LONG DOCUMENTS)
+# -------------------------------------------------
+# Facts kept per topic after merging chunks: bounds the final prompt
+MAX_FACTS_PER_TOPIC = 12
+
+NOTES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "topics": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "topic": {"type": "string", "enum": TOPICS},
+                    "facts": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["topic", "facts"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["topics"],
+    "additionalProperties": False,
+}
+
+
+def build_notes_prompt(chunk_text: str) -> str:
+    topics = "\n".join(f"  - {topic}" for topic in TOPICS)
+    return f"""
+You are preparing notes for a government training video.
+
+TASK:
+The TEXT below is ONE PART of a longer document. Extract the facts it
+contains for each of these topics:
+{topics}
+
+RULES:
+- Use ONLY information from the text; do NOT invent anything
+- Omit topics the text says nothing about
+- One short fact per item, max 15 words, keep names / fees / dates exact
+
+OUTPUT FORMAT (JSON ONLY):
+{{"topics": [{{"topic": "", "facts": []}}]}}
+
+TEXT:
+{chunk_text}
+"""
+
+
+def format_notes(notes):
+    """Topic → facts as plain text, used as RAW TEXT for the final slide prompt."""
+    return "\n\n".join(
+        f"{topic}:\n" + "\n".join(f"- {fact}" for fact in facts)
+        for topic, facts in notes.items()
+        if facts
+    )
+
+
+# -------------------------------------------------
+# SCHEMA + PER-SLIDE VALIDATION
+# -------------------------------------------------
+MIN_BULLETS = 4
+MAX_BULLETS = 6
+
+# Standard JSON Schema; sent to the API as a structured-output constraint
+SLIDE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "slides": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "slide_no": {"type": "integer"},
+                    "title": {"type": "string"},
+                    "bullets": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "minItems": MIN_BULLETS,
+                        "maxItems": MAX_BULLETS,
+                    },
+                    "image_keyword": {"type": "string"},
+                },
+                "required": ["slide_no", "title", "bullets", "image_keyword"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["slides"],
+    "additionalProperties": False,
+}
+
+
+def validate_slide(slide):
+    """
+    Clean one slide dict, or raise ValueError saying why it is unusable.
+    More than MAX_BULLETS bullets are trimmed rather than rejected.
+    """
+    if not isinstance(slide, dict):
+        raise ValueError("slide is not an object")
+
+    title = str(slide.get("title") or "").strip()
+    if not title:
+        raise ValueError("missing title")
+
+    keyword = str(slide.get("image_keyword") or "").strip()
+    if not keyword:
+        raise ValueError(f"'{title}': missing image_keyword")
+
+    bullets = slide.get("bullets")
+    if not isinstance(bullets, list):
+        raise ValueError(f"'{title}': bullets is not a list")
+    bullets = [str(b).strip() for b in bullets if str(b).strip()]
+    if len(bullets) < MIN_BULLETS:
+        raise ValueError(f"'{title}': {len(bullets)} bullets (min {MIN_BULLETS})")
+
+    return {
+        "slide_no": slide.get("slide_no"),
+        "title": title,
+        "bullets": bullets[:MAX_BULLETS],
+        "image_keyword": keyword,
+    }
+
+
+# -------------------------------------------------
+# INCREMENTAL PARSER
+# -------------------------------------------------
+class SlideStreamParser:
+    """
+    Incremental parser for {"slides": [{...}, {...}]} arriving in chunks.
+
+    feed() returns every slide object completed by that chunk (already
+    validated), so the first slide is usable long before the response
+    ends. Invalid slides are logged and skipped. Text around the JSON
+    (e.g. markdown fences) is ignored.
+    """
+
+    def __init__(self, source: str = "LLM"):
+        self.source = source
+        self._pos = 0
+        self._text = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._slide_start = None
+        self._seen_json = False
+        self.skipped = 0
+
+    def feed(self, chunk: str):
+        slides = []
+        self._text += chunk
+        text = self._text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                if self._depth:
+                    self._in_string = True
+            elif ch in "{[":
+                self._seen_json = True
+                self._depth += 1
+                # depth 1 = root object, 2 = "slides" array, 3 = one slide
+                if ch == "{" and self._depth == 3:
+                    self._slide_start = i
+            elif ch in "}]" and self._depth:
+                if ch == "}" and self._depth == 3 and self._slide_start is not None:
+                    slide = self._parse(text[self._slide_start:i + 1])
+                    if slide:
+                        slides.append(slide)
+                    self._slide_start = None
+                self._depth -= 1
+
+        # Keep only what an unfinished slide still needs
+        keep_from = self._slide_start if self._slide_start is not None else len(text)
+        if self._slide_start is not None:
+            self._slide_start = 0
+        self._text = text[keep_from:]
+        self._pos = len(self._text)
+        return slides
+
+    def _parse(self, raw):
+        try:
+            return validate_slide(json.loads(raw))
+        except ValueError as e:  # json.JSONDecodeError is a ValueError
+            self.skipped += 1
+            logging.warning(f"[Slides] Skipping invalid slide from {self.source}: {e}")
+            return None
+
+    def close(self):
+        if not self._seen_json:
+            raise ValueError(f"No JSON found in {self.source} response")
+        if self._depth:
+            logging.warning(f"[Slides] {self.source} response ended mid-JSON")
@@ -3,29 +3,66 @@ Unsplash image service for training video generation
 
 Goals:
 - Stable & predictable images
-- Caching to avoid API overuse
+- Caching to avoid API overuse (indexed, size-bounded, negative entries
+  for dead keywords: see utils/image_cache.py)
 - Safe fallback if API fails
+- One pooled keep-alive session, concurrent batch prefetch
+- Approved local library first (services/image_library.py); Unsplash
+  only for keywords the library cannot match
+- Sized downloads: ask Unsplash for the slide's pixel size, then crop /
+  resize / enhance once into a cached derivative keyed by that size
 """
 
 import os
 import requests
 import hashlib
-from urllib.parse import quote_plus
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.image_library import image_library
+from utils.image_cache import image_cache
+from utils.image_utils import prepare_slide_image
 
 # -------------------------------------------------
 # CONFIG
 # -------------------------------------------------
 
-UNSPLASH_URL = "https://api.unsplash.com/search/photos"
+# Overridable so the service can be pointed at a local mock server
+UNSPLASH_URL = os.getenv("UNSPLASH_API_URL", "https://api.unsplash.com/search/photos")
+# auto: local library, then Unsplash | library: offline only | unsplash: skip library
+IMAGE_SOURCE = os.getenv("BSK_IMAGE_SOURCE", "auto").lower()
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
-if not UNSPLASH_ACCESS_KEY:
+if not UNSPLASH_ACCESS_KEY and IMAGE_SOURCE != "library":
     raise ValueError("UNSPLASH_ACCESS_KEY environment variable is required. Please set it in your .env file or environment.")
 IMAGES_DIR = "images"
 FALLBACK_IMAGE = "images/fallback_video.jpg"
 
+PREFETCH_WORKERS = 6  # also the connection pool size
+REQUEST_TIMEOUT = 10
+DOWNLOAD_CHUNK = 64 * 1024
+# Unsplash quotas are hourly; once exhausted, stop calling until then
+RATE_LIMIT_COOLDOWN = 60 * 60
+# Unsplash (imgix) resizes server-side; derivatives are re-encoded locally
+SIZED_URL_PARAMS = {"fit": "crop", "crop": "entropy", "fm": "jpg", "q": 85, "dpr": 1}
+
 os.makedirs(IMAGES_DIR, exist_ok=True)
 
 
+class RateLimited(RuntimeError):
+    pass
+
+
+class NoResults(ValueError):
+    """The search answered, but with nothing usable for the query."""
+
+
 # -------------------------------------------------
 # INTERNAL HELPERS
 # -------------------------------------------------
@@ -40,14 +77,106 @@ def normalize_query(query: str) -> str:
     return query
 
 
-def cached_image_path(query: str) -> str:
+def cached_image_path(query: str, size=None) -> str:
     """
     Generate deterministic cache filename from query
+    (and target size, for derivatives: <hash>_<w>x<h>.jpg)
     """
     hash_key = hashlib.md5(query.encode("utf-8")).hexdigest()
+    if size:
+        return os.path.join(IMAGES_DIR, f"{hash_key}_{size[0]}x{size[1]}.jpg")
     return os.path.join(IMAGES_DIR, f"{hash_key}.jpg")
 
 
+def cache_key(query: str, size=None) -> str:
+    """Index key: one entry per (query, target size)."""
+    return f"{query}|{size[0]}x{size[1]}" if size else query
+
+
+def attribution(photo) -> str:
+    """Unsplash credit line for a search result."""
+    user = photo.get("user") or {}
+    link = (photo.get("links") or {}).get("html", "")
+    return f"Photo by {user.get('name', 'unknown')} on Unsplash {link}".strip()
+
+
+def sized_url(photo, size) -> str:
+    """Unsplash URL that serves the photo already cropped to `size`."""
+    raw = photo["urls"]["raw"]
+    params = {"w": size[0], "h": size[1], **SIZED_URL_PARAMS}
+    return f"{raw}{'&' if '?' in raw else '?'}{urlencode(params)}"
+
+
+def make_derivative(source: str, path: str, size) -> str:
+    """Crop / resize / enhance `source` into `path`; the file appears atomically."""
+    temp_path = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        prepare_slide_image(source, size=size, output_path=temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path
+
+
+# -------------------------------------------------
+# HTTP SESSION (POOLED, KEEP-ALIVE)
+# -------------------------------------------------
+_session = None
+_session_lock = threading.Lock()
+_blocked_until = 0.0
+
+
+def get_session() -> requests.Session:
+    """Shared session: keep-alive connections + retries on 5xx."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=2,
+                backoff_factor=0.5,
+                status_forcelist=[500, 502, 503, 504],
+                allowed_methods=["GET"],
+                # A 429's Retry-After can be an hour: _check_rate_limit
+                # pauses the API instead of blocking a worker in sleep()
+                respect_retry_after_header=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=4, pool_maxsize=PREFETCH_WORKERS, max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _header_int(response, name):
+    """Integer header value, or None when missing or malformed."""
+    try:
+        return int(response.headers.get(name, "").strip())
+    except ValueError:
+        return None
+
+
+def _check_rate_limit(response):
+    """
+    Honour X-Ratelimit-Remaining / Retry-After from the search API.
+    A 429 raises RateLimited; a response that used the last request of
+    the quota is still returned, but later calls are paused.
+    """
+    global _blocked_until
+    remaining = _header_int(response, "X-Ratelimit-Remaining")
+    if response.status_code == 429 or (remaining is not None and remaining <= 0):
+        retry_after = _header_int(response, "Retry-After")
+        wait = retry_after if retry_after and retry_after > 0 else RATE_LIMIT_COOLDOWN
+        with _session_lock:
+            _blocked_until = max(_blocked_until, time.time() + wait)
+        logging.warning(f"[Unsplash] Rate limit reached; API paused for {wait}s")
+        if response.status_code == 429:
+            raise RateLimited("Unsplash rate limit reached")
+
+
 # -------------------------------------------------
 # UNSPLASH FETCH
 # -------------------------------------------------
@@ -57,29 +186,78 @@ def fetch_photo_from_unsplash(query: str):
     """
     Fetch a single Unsplash image metadata
     """
+    if time.time() < _blocked_until:
+        raise RateLimited("Unsplash rate limit reached")
+
     headers = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
 
-    params = {"query": quote_plus(query), "per_page": 5, "orientation": "landscape"}
+    params = {"query": query, "per_page": 5, "orientation": "landscape"}
 
-    response = requests.get(UNSPLASH_URL, headers=headers, params=params, timeout=10)
+    response = get_session().get(
+        UNSPLASH_URL, headers=headers, params=params, timeout=REQUEST_TIMEOUT
+    )
+    _check_rate_limit(response)
     response.raise_for_status()
 
     results = response.json().get("results", [])
     if not results:
-        raise ValueError("No images found")
+        raise NoResults("No images found")
 
     # Pick the most relevant image (first result)
     return results[0]
 
 
+def download_to(url: str, path: str) -> str:
+    """Stream an image to disk in chunks; the file appears atomically."""
+    temp_path = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        with get_session().get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            with open(temp_path, "wb") as f:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK):
+                    f.write(chunk)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path
+
+
+def library_photo(query: str, size=None):
+    """
+    Best local library image for `query` (sized derivative when `size`
+    is given), or None when nothing in the library matches well enough.
+    """
+    match = image_library.match(query)
+    if match is None:
+        return None
+    source, score = match
+    if not size:
+        return source
+
+    # Replacing a library file changes its mtime, hence its derivative
+    source_id = f"library:{source}:{os.stat(source).st_mtime_ns}"
+    key = cache_key(source_id, size)
+    status, cached_path = image_cache.lookup(key)
+    if status == "hit":
+        return cached_path
+
+    logging.info(f"[Library] '{query}' → {source} (score {score:.2f})")
+    image_path = cached_image_path(source_id, size)
+    make_derivative(source, image_path, size)
+    return image_cache.put(key, query, image_path, attribution=f"Image library: {source}")
+
+
 # -------------------------------------------------
 # PUBLIC API
 # -------------------------------------------------
 
 
-def fetch_and_save_photo(query: str) -> str:
+def fetch_and_save_photo(query: str, size=None) -> str:
     """
-    Fetch an image from Unsplash and cache it locally.
+    Fetch an image from the local library or Unsplash and cache it locally.
+    With size=(w, h), downloads that size only and returns a ready-to-blit
+    derivative of exactly w x h pixels.
     Always returns a local image path.
     """
 
@@ -88,36 +266,104 @@ def fetch_and_save_photo(query: str) -> str:
 
     query = normalize_query(query)
 
+    # -----------------------------
+    # LOCAL LIBRARY (NO NETWORK)
+    # -----------------------------
+    if IMAGE_SOURCE != "unsplash":
+        try:
+            local_path = library_photo(query, size)
+        except Exception as e:
+            logging.warning(f"[Library] Lookup failed for '{query}': {e}")
+            local_path = None
+        if local_path:
+            return local_path
+        if IMAGE_SOURCE == "library":
+            return fallback_image()
+
     # -----------------------------
     # CACHE CHECK
     # -----------------------------
-    image_path = cached_image_path(query)
+    key = cache_key(query, size)
+    status, cached_path = image_cache.lookup(key)
+    if status == "hit":
+        return cached_path
+    if status == "failed":
+        return fallback_image()
+
+    image_path = cached_image_path(query, size)
     if os.path.exists(image_path):
-        return image_path
+        return image_cache.put(key, query, image_path)
+    if size and os.path.exists(cached_image_path(query)):
+        # Full-size image from an earlier run: derive without the network
+        make_derivative(cached_image_path(query), image_path, size)
+        return image_cache.put(key, query, image_path)
 
     # -----------------------------
     # FETCH FROM UNSPLASH
     # -----------------------------
     try:
         photo = fetch_photo_from_unsplash(query)
-        image_url = photo["urls"]["regular"]
-
-        image_data = requests.get(image_url, timeout=10).content
-        with open(image_path, "wb") as f:
-            f.write(image_data)
+        if not size:
+            download_to(photo["urls"]["regular"], image_path)
+        else:
+            download_path = f"{image_path}.{uuid.uuid4().hex}.src"
+            try:
+                download_to(sized_url(photo, size), download_path)
+                make_derivative(download_path, image_path, size)
+            finally:
+                if os.path.exists(download_path):
+                    os.remove(download_path)
+        return image_cache.put(
+            key, query, image_path, photo_id=photo.get("id"), attribution=attribution(photo)
+        )
 
-        return image_path
+    except NoResults as e:
+        print(f"[Unsplash] Fallback used for query '{query}': {e}")
+        # Only a dead keyword is remembered, so it does not cost an API
+        # call per slide; rate limits, auth, server and disk errors are
+        # retried on the next request
+        image_cache.put_failure(key, query)
+        return fallback_image()
 
     except Exception as e:
         print(f"[Unsplash] Fallback used for query '{query}': {e}")
-        # Ensure fallback image exists
-        if not os.path.exists(FALLBACK_IMAGE):
-            # Create a simple fallback image if it doesn't exist
-            try:
-                from PIL import Image
-                os.makedirs(IMAGES_DIR, exist_ok=True)
-                img = Image.new("RGB", (1280, 720), (30, 30, 40))
-                img.save(FALLBACK_IMAGE, "JPEG", quality=90)
-            except Exception:
-                pass  # If PIL fails, video_utils will handle missing image
-        return FALLBACK_IMAGE
+        return fallback_image()
+
+
+def fallback_image() -> str:
+    """Plain background used whenever no photo is available."""
+    # Ensure fallback image exists
+    if not os.path.exists(FALLBACK_IMAGE):
+        # Create a simple fallback image if it doesn't exist
+        try:
+            from PIL import Image
+            os.makedirs(IMAGES_DIR, exist_ok=True)
+            img = Image.new("RGB", (1280, 720), (30, 30, 40))
+            img.save(FALLBACK_IMAGE, "JPEG", quality=90)
+        except Exception:
+            pass  # If PIL fails, video_utils will handle missing image
+    return FALLBACK_IMAGE
+
+
+def prefetch_photos(keywords, workers: int = PREFETCH_WORKERS, size=None) -> dict:
+    """
+    Fetch the images for many keywords at once.
+
+    Keywords are deduplicated after normalization, so repeated keywords
+    cost one request. Returns {keyword: local image path} for every input
+    keyword (fallback image on failure); `size` as in fetch_and_save_photo.
+    """
+    unique = {}
+    for keyword in keywords:
+        unique.setdefault(normalize_query(keyword or ""), []).append(keyword)
+    if not unique:
+        return {}
+
+    with ThreadPoolExecutor(max(1, min(workers, len(unique)))) as pool:
+        paths = dict(zip(unique, pool.map(partial(fetch_and_save_photo, size=size), unique)))
+
+    return {
+        keyword: paths[query]
+        for query, originals in unique.items()
+        for keyword in originals
+    }
@@ -5,13 +5,21 @@ Goals:
 - Clear, slow, professional narration
 - Natural pauses between bullet points
 - Predictable duration for video sync
+- Never synthesize the same narration twice (content-addressed cache)
 """
 
-import tempfile
 import edge_tts
 import asyncio
+import inspect
+import json
+import logging
+import random
 import re
 import os
+import shutil
+import time
+
+from utils.disk_cache import DiskCache, make_key
 
 # -------------------------------------------------
 # DEFAULT VOICE SETTINGS (TRAINING OPTIMIZED)
@@ -20,6 +28,53 @@ DEFAULT_VOICE = "en-IN-NeerjaNeural"  # Indian English, calm & professional
 DEFAULT_RATE = "+5%"  # Slightly slower than normal
 DEFAULT_PITCH = "+0Hz"
 
+# -------------------------------------------------
+# BATCH SETTINGS
+# -------------------------------------------------
+TTS_CONCURRENCY = 4  # simultaneous edge-tts websocket sessions
+TTS_RETRIES = 3
+TTS_RETRY_BASE_DELAY = 0.5  # seconds, doubled per attempt, jittered
+TTS_TIMEOUT = 60  # seconds per synthesis attempt
+
+
+def _transient_tts_errors():
+    """
+    Network / service failures worth retrying. Local errors (missing or
+    unwritable files, workspace quota) are not listed and fail fast.
+    """
+    errors = [asyncio.TimeoutError, ConnectionError]
+    try:
+        import aiohttp
+        errors.append(aiohttp.ClientError)
+    except ImportError:
+        pass
+    exceptions = getattr(edge_tts, "exceptions", None)
+    for name in ("NoAudioReceived", "WebSocketError", "UnexpectedResponse", "UnknownResponse"):
+        error = getattr(exceptions, name, None)
+        if isinstance(error, type):
+            errors.append(error)
+    return tuple(errors)
+
+
+TRANSIENT_TTS_ERRORS = _transient_tts_errors()
+
+# -------------------------------------------------
+# AUDIO CACHE
+# -------------------------------------------------
+TTS_CACHE_DIR = os.path.join("cache", "tts")
+TTS_CACHE_MAX_MB = int(os.getenv("BSK_TTS_CACHE_MB", "512"))
+
+TTS_META_CACHE_DIR = os.path.join("cache", "tts_meta")
+
+tts_cache = DiskCache(TTS_CACHE_DIR, TTS_CACHE_MAX_MB * 1024 * 1024, suffix=".mp3")
+# Duration / sample rate / word timings for each cached clip (tiny JSON files)
+tts_meta_cache = DiskCache(TTS_META_CACHE_DIR, 32 * 1024 * 1024, suffix=".json")
+
+
+def tts_cache_key(narration_text: str, voice: str, rate: str, pitch: str) -> str:
+    """Cache key for already-prepared narration text."""
+    return make_key("tts-v1", narration_text, voice, rate, pitch)
+
 
 # -------------------------------------------------
 # TEXT PRE-PROCESSING (VERY IMPORTANT)
@@ -43,6 +98,100 @@ def prepare_narration_text(text: str) -> str:
     return text.strip()
 
 
+# -------------------------------------------------
+# MP3 HEADER PROBE (NO DECODER)
+# -------------------------------------------------
+# Layer III bitrates (kbps) indexed by header bits; MPEG-2 / 2.5 share a table
+_MP3_BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],  # MPEG-2.5
+}
+
+
+def probe_mp3(path: str) -> dict:
+    """
+    Exact duration / sample rate of a Layer III MP3 by walking frame
+    headers. Reads the file once; never starts an ffmpeg decoder.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    pos = 0
+    if data[:3] == b"ID3":  # skip ID3v2 tag (syncsafe size)
+        size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+        pos = 10 + size
+
+    frames = 0
+    sample_rate = None
+    samples_per_frame = None
+    while pos + 4 <= len(data):
+        b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+        version = (b1 >> 3) & 0x3
+        layer = (b1 >> 1) & 0x3
+        bitrate_idx = b2 >> 4
+        rate_idx = (b2 >> 2) & 0x3
+        if (
+            data[pos] != 0xFF
+            or (b1 & 0xE0) != 0xE0
+            or version == 1
+            or layer != 1  # Layer III
+            or bitrate_idx in (0, 15)
+            or rate_idx == 3
+        ):
+            pos += 1  # resync
+            continue
+
+        mpeg1 = version == 3
+        bitrate = _MP3_BITRATES["mpeg1" if mpeg1 else "mpeg2"][bitrate_idx] * 1000
+        rate = _MP3_SAMPLE_RATES[version][rate_idx]
+        padding = (b2 >> 1) & 0x1
+        frame_len = (144 if mpeg1 else 72) * bitrate // rate + padding
+
+        # A leading Xing/Info frame carries metadata, not audio
+        is_info = frames == 0 and (
+            b"Xing" in data[pos:pos + 64] or b"Info" in data[pos:pos + 64]
+        )
+        if not is_info:
+            frames += 1
+        sample_rate = rate
+        samples_per_frame = 1152 if mpeg1 else 576
+        pos += frame_len
+
+    if not frames:
+        raise ValueError(f"No MP3 frames found in {path}")
+
+    return {
+        "duration": frames * samples_per_frame / sample_rate,
+        "sample_rate": sample_rate,
+    }
+
+
+def audio_entry_from_file(path: str) -> dict:
+    """Manifest entry for an existing MP3 (no word timings)."""
+    return {"path": path, **probe_mp3(path), "words": []}
+
+
+# -------------------------------------------------
+# AUDIO MANIFEST
+# -------------------------------------------------
+def write_audio_manifest(entries, path):
+    """
+    Persist the TTS stage output: per clip path, exact duration,
+    sample rate and word-boundary timings. A record of the job for
+    inspection; the render stages use the in-memory entries.
+    """
+    keys = ("path", "duration", "sample_rate", "words", "word_bullets", "bullet_starts")
+    manifest = [{k: entry[k] for k in keys if k in entry} for entry in entries]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "clips": manifest}, f, ensure_ascii=False)
+    return path
+
+
 # -------------------------------------------------
 # TEXT TO SPEECH (ASYNC)
 # -------------------------------------------------
@@ -51,32 +200,274 @@ async def text_to_speech(
     voice: str = DEFAULT_VOICE,
     rate: str = DEFAULT_RATE,
     pitch: str = DEFAULT_PITCH,
+    workspace=None,
+    use_cache: bool = True,
 ):
     """
     Generate narration audio for one slide.
 
     Input:
     - text: narration text (usually slide bullets joined)
+    - workspace: optional JobWorkspace that owns the generated file
+    - use_cache: reuse / store audio keyed on (narration, voice, rate, pitch);
+      without the cache a workspace is required to own the file
     Output:
-    - path to generated .mp3 file
+    - path to generated .mp3 file (inside `workspace` when one is given,
+      otherwise the shared cache entry)
     """
+    entry = await synthesize_narration(text, voice, rate, pitch, workspace, use_cache)
+    return entry["path"]
+
+
+async def synthesize_narration(
+    text: str,
+    voice: str = DEFAULT_VOICE,
+    rate: str = DEFAULT_RATE,
+    pitch: str = DEFAULT_PITCH,
+    workspace=None,
+    use_cache: bool = True,
+):
+    """
+    Like text_to_speech, but returns the manifest entry:
+    {"path", "duration", "sample_rate", "words": [{"text", "start", "end"}],
+     "cached": served from the TTS cache}
+    """
+
+    if not use_cache and workspace is None:
+        # Nothing else would ever delete the file
+        raise ValueError("use_cache=False needs a workspace to own the audio file")
 
     narration_text = prepare_narration_text(text)
 
+    # -------- CACHE HIT: NO NETWORK --------
+    key = tts_cache_key(narration_text, voice, rate, pitch)
+    if use_cache:
+        cached = tts_cache.get(key)
+        if cached:
+            entry = _cached_entry(key, cached)
+            entry["cached"] = True
+            if workspace is not None:
+                entry["path"] = _link_into_workspace(entry["path"], workspace)
+            return entry
+
+    # A miss is written once: straight into the cache when caching
+    if use_cache:
+        output_path = tts_cache.temp_path(key)
+    else:
+        output_path = workspace.new_file(".mp3", kind="audio")
+
+    try:
+        entry = await _synthesize(narration_text, voice, rate, pitch, output_path)
+    except BaseException:
+        # Failed / cancelled attempts must not leave partial files behind
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+    entry["cached"] = False
+    if use_cache:
+        entry["path"] = _store_cached_entry(key, entry, temp_path=output_path)
+        if workspace is not None:
+            entry["path"] = _link_into_workspace(entry["path"], workspace)
+    else:
+        workspace.commit(entry["path"])
+
+    return entry
+
+
+def _link_into_workspace(cache_path, workspace):
+    """
+    The job keeps its own link to a cache file, so cache eviction cannot
+    pull it from under a running render. Hard link (no second write);
+    copy across filesystems.
+    """
+    path = workspace.new_file(".mp3", kind="audio")
+    try:
+        os.link(cache_path, path)
+    except OSError:
+        workspace.reserve(os.path.getsize(cache_path))
+        shutil.copyfile(cache_path, path)
+    workspace.commit(path)
+    return path
+
+
+def _cached_entry(key, path):
+    meta_path = tts_meta_cache.get(key)
+    if meta_path:
+        with open(meta_path, encoding="utf-8") as f:
+            return {"path": path, **json.load(f)}
+    # Metadata evicted separately: one header probe rebuilds timing
+    return audio_entry_from_file(path)
+
+
+def _store_cached_entry(key, entry, temp_path):
+    """Move finished audio into the cache and store its metadata."""
+    path = tts_cache.commit(key, temp_path)
+    meta = {k: entry[k] for k in ("duration", "sample_rate", "words")}
+    tts_meta_cache.put_bytes(key, json.dumps(meta).encode("utf-8"))
+    return path
+
+
+# edge-tts >= 7 defaults to sentence boundaries; ask for words explicitly
+_BOUNDARY_KWARGS = (
+    {"boundary": "WordBoundary"}
+    if "boundary" in inspect.signature(edge_tts.Communicate).parameters
+    else {}
+)
+
+
+async def _synthesize(narration_text, voice, rate, pitch, output_path):
     communicate = edge_tts.Communicate(
-        text=narration_text, voice=voice, rate=rate, pitch=pitch
+        text=narration_text, voice=voice, rate=rate, pitch=pitch, **_BOUNDARY_KWARGS
     )
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as audio_file:
-        output_path = audio_file.name
-
-    await communicate.save(output_path)
+    # Stream audio and word boundaries in the same pass
+    words = []
+    with open(output_path, "wb") as f:
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                f.write(chunk["data"])
+            elif chunk["type"] == "WordBoundary":
+                start = chunk["offset"] / 1e7  # 100 ns ticks
+                words.append(
+                    {
+                        "text": chunk["text"],
+                        "start": round(start, 3),
+                        "end": round(start + chunk["duration"] / 1e7, 3),
+                    }
+                )
 
     # -------- HARD VALIDATION --------
     if not os.path.exists(output_path) or os.path.getsize(output_path) < 1024:
         raise RuntimeError("TTS failed: empty or invalid audio file generated")
 
-    return output_path
+    return {"path": output_path, **probe_mp3(output_path), "words": words}
+
+
+# -------------------------------------------------
+# BATCH SYNTHESIS (ONE EVENT LOOP PER DECK)
+# -------------------------------------------------
+async def synthesize_batch_async(
+    texts,
+    voice: str = DEFAULT_VOICE,
+    rate: str = DEFAULT_RATE,
+    pitch: str = DEFAULT_PITCH,
+    workspace=None,
+    concurrency: int = TTS_CONCURRENCY,
+    retries: int = TTS_RETRIES,
+    on_result=None,
+):
+    """
+    Synthesize many narrations on the running event loop.
+
+    - at most `concurrency` syntheses in flight (asyncio.Semaphore)
+    - transient failures retried with jittered exponential backoff
+    - on_result(result) is called as each item finishes
+    - texts may be an async iterator: each narration starts as it arrives
+    Returns one manifest entry per text, in input order, plus stats:
+    {"index", "path", "duration", "sample_rate", "words",
+     "seconds", "attempts", "cached"}
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def synthesize_one(index, text):
+        start = time.perf_counter()
+
+        async with semaphore:
+            for attempt in range(1, retries + 1):
+                try:
+                    entry = await asyncio.wait_for(
+                        synthesize_narration(
+                            text, voice=voice, rate=rate, pitch=pitch, workspace=workspace
+                        ),
+                        TTS_TIMEOUT,
+                    )
+                    break
+                except TRANSIENT_TTS_ERRORS as e:
+                    if attempt == retries:
+                        raise
+                    delay = TTS_RETRY_BASE_DELAY * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                    logging.warning(
+                        f"[TTS] Item {index} attempt {attempt} failed ({e!r}); "
+                        f"retrying in {delay:.2f}s"
+                    )
+                    await asyncio.sleep(delay)
+
+        result = {
+            "index": index,
+            **entry,
+            "seconds": round(time.perf_counter() - start, 3),
+            "attempts": attempt,
+        }
+        if on_result:
+            on_result(result)
+        return result
+
+    if hasattr(texts, "__aiter__"):
+        tasks = []
+        async for text in texts:
+            tasks.append(asyncio.create_task(synthesize_one(len(tasks), text)))
+        return await asyncio.gather(*tasks)
+
+    return await asyncio.gather(*(synthesize_one(i, t) for i, t in enumerate(texts)))
+
+
+def synthesize_batch(
+    texts,
+    voice: str = DEFAULT_VOICE,
+    rate: str = DEFAULT_RATE,
+    pitch: str = DEFAULT_PITCH,
+    workspace=None,
+    concurrency: int = TTS_CONCURRENCY,
+    retries: int = TTS_RETRIES,
+):
+    """Sync wrapper: one event loop for the whole deck."""
+    return asyncio.run(
+        synthesize_batch_async(
+            texts, voice, rate, pitch, workspace, concurrency, retries
+        )
+    )
+
+
+# -------------------------------------------------
+# CACHE PRE-WARM (WHOLE DECK)
+# -------------------------------------------------
+async def prewarm_tts_cache_async(
+    texts,
+    voice: str = DEFAULT_VOICE,
+    rate: str = DEFAULT_RATE,
+    pitch: str = DEFAULT_PITCH,
+):
+    """
+    Synthesize every narration that is not cached yet, straight into
+    the cache. Returns the number of newly cached clips.
+    """
+    missing = {}
+    for text in texts:
+        narration_text = prepare_narration_text(text)
+        key = tts_cache_key(narration_text, voice, rate, pitch)
+        if key not in missing and not os.path.exists(tts_cache.path_for(key)):
+            missing[key] = narration_text
+
+    semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+
+    async def warm(key, narration_text):
+        temp_path = tts_cache.temp_path(key)
+        try:
+            async with semaphore:
+                entry = await _synthesize(narration_text, voice, rate, pitch, temp_path)
+            _store_cached_entry(key, entry, temp_path=temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    await asyncio.gather(*(warm(k, t) for k, t in missing.items()))
+    return len(missing)
+
+
+def prewarm_tts_cache(texts, voice=DEFAULT_VOICE, rate=DEFAULT_RATE, pitch=DEFAULT_PITCH):
+    """Sync wrapper, e.g. prewarm_tts_cache([" ".join(s["bullets"]) for s in slides])."""
+    return asyncio.run(prewarm_tts_cache_async(texts, voice, rate, pitch))
 
 
 
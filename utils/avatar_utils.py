@@ -6,10 +6,14 @@ Design goals:
 - Subtle motion (no distraction)
 - Syncs with audio duration
 - Easily replaceable with real lip-sync later
+- Animation rendered ONCE into a cached sprite loop, never resized per frame
 """
 
+import hashlib
 import os
-from moviepy.editor import ImageClip, CompositeVideoClip
+import threading
+from moviepy.editor import VideoClip, CompositeVideoClip
+from PIL import Image
 import numpy as np
 
 # -------------------------------------------------
@@ -18,6 +22,80 @@ import numpy as np
 DEFAULT_AVATAR_PATH = "assets/avatar/avatar.png"  # Provide a clean PNG avatar
 AVATAR_HEIGHT = 220  # Professional size (not too big)
 
+AVATAR_FPS = 30
+BREATH_PERIOD = 4  # seconds per breathing cycle (scale)
+SWAY_PERIOD = 6  # seconds per head sway (pure translation, applied at blit)
+SPRITE_CACHE_DIR = os.path.join("cache", "avatar")
+
+_sprite_cache = {}
+_sprite_lock = threading.Lock()
+
+
+# -------------------------------------------------
+# SPRITE CACHE
+# -------------------------------------------------
+def breathing_scale(t):
+    return 1 + 0.015 * np.sin(2 * np.pi * t / BREATH_PERIOD)
+
+
+def _sprite_file(avatar_path, height):
+    with open(avatar_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    return os.path.join(SPRITE_CACHE_DIR, f"{digest}_{height}.npy")
+
+
+def _render_sprites(avatar_path, height):
+    """
+    Render one breathing cycle as a (frames, H, W, 4) uint8 array.
+    Frames are anchored top-left and padded to the largest scale,
+    matching how MoviePy positions a resized clip.
+    """
+    with Image.open(avatar_path) as img:
+        base = img.convert("RGBA")
+    width = round(base.width * height / base.height)
+    base = base.resize((width, height), Image.LANCZOS)
+
+    n_frames = BREATH_PERIOD * AVATAR_FPS
+    scales = [breathing_scale(i / AVATAR_FPS) for i in range(n_frames)]
+    max_scale = max(scales)
+    sprites = np.zeros(
+        (n_frames, int(height * max_scale) + 1, int(width * max_scale) + 1, 4),
+        dtype=np.uint8,
+    )
+
+    for i, scale in enumerate(scales):
+        frame = base.resize(
+            (int(width * scale), int(height * scale)), Image.LANCZOS
+        )
+        sprites[i, : frame.height, : frame.width] = np.asarray(frame)
+
+    return sprites
+
+
+def load_avatar_sprites(avatar_path=DEFAULT_AVATAR_PATH, height=AVATAR_HEIGHT):
+    """
+    Return the cached sprite loop for an avatar file and height.
+    Rendered once, saved under cache/avatar/ and memory-mapped on reuse.
+    """
+    key = (os.path.abspath(avatar_path), height, os.path.getmtime(avatar_path))
+
+    with _sprite_lock:
+        if key in _sprite_cache:
+            return _sprite_cache[key]
+
+        cache_path = _sprite_file(avatar_path, height)
+        if not os.path.exists(cache_path):
+            sprites = _render_sprites(avatar_path, height)
+            os.makedirs(SPRITE_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, sprites)
+            os.replace(tmp_path, cache_path)  # atomic for concurrent workers
+
+        sprites = np.load(cache_path, mmap_mode="r")
+        _sprite_cache[key] = sprites
+        return sprites
+
 
 # -------------------------------------------------
 # AVATAR CLIP GENERATOR
@@ -34,19 +112,27 @@ def create_avatar_clip(duration, position=("left", "bottom")):
     if not os.path.exists(DEFAULT_AVATAR_PATH):
         return None
 
-    avatar = ImageClip(DEFAULT_AVATAR_PATH).resize(height=AVATAR_HEIGHT)
-    avatar = avatar.set_duration(duration)
+    sprites = load_avatar_sprites(DEFAULT_AVATAR_PATH, AVATAR_HEIGHT)
 
     # -----------------------------
-    # SUBTLE BREATHING EFFECT
+    # SUBTLE BREATHING EFFECT (precomputed loop, indexed by t)
     # -----------------------------
-    avatar = avatar.resize(lambda t: 1 + 0.015 * np.sin(2 * np.pi * t / 4))
+    def sprite_index(t):
+        return int(round(t * AVATAR_FPS)) % len(sprites)
+
+    avatar = VideoClip(lambda t: sprites[sprite_index(t)][..., :3], duration=duration)
+    mask = VideoClip(
+        lambda t: sprites[sprite_index(t)][..., 3] / 255.0,
+        ismask=True,
+        duration=duration,
+    )
+    avatar = avatar.set_mask(mask)
 
     # -----------------------------
     # SUBTLE HEAD SWAY
     # -----------------------------
     def avatar_position(t):
-        sway = 4 * np.sin(2 * np.pi * t / 6)
+        sway = 4 * np.sin(2 * np.pi * t / SWAY_PERIOD)
         return (60 + sway, 720 - AVATAR_HEIGHT - 40)
 
     avatar = avatar.set_position(avatar_position)
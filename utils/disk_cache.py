@@ -0,0 +1,149 @@
+"""
+Content-addressed on-disk cache
+
+Goals:
+- One file per entry, named by a hash of its inputs
+- Atomic writes (temp file + rename), safe across threads and processes
+- Size-bounded LRU eviction (file atime = last access)
+- Optional TTL (file mtime = time written)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+
+def make_key(*parts) -> str:
+    """Stable SHA-256 key for any JSON-serialisable inputs."""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    Directory of cached files with LRU eviction.
+
+    get() touches an entry so eviction removes the least recently used
+    files first once the directory grows past max_bytes. With `ttl`
+    (seconds), entries older than that are treated as misses and removed.
+    """
+
+    def __init__(self, directory, max_bytes, suffix="", ttl=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # PATHS
+    # -----------------------------
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def temp_path(self, key):
+        """Unique scratch path in the cache dir (same filesystem → atomic rename)."""
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp")
+
+    # -----------------------------
+    # READ
+    # -----------------------------
+    def get(self, key):
+        """Path of a cached entry (refreshing its LRU position), or None."""
+        path = self.path_for(key)
+        now = time.time()
+        try:
+            st = os.stat(path)
+            if self.ttl is not None and now - st.st_mtime > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            # atime = last access (LRU), mtime = written (TTL)
+            os.utime(path, (now, st.st_mtime))
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return path
+
+    # -----------------------------
+    # WRITE
+    # -----------------------------
+    def commit(self, key, temp_path):
+        """Atomically move a finished temp file into place."""
+        path = self.path_for(key)
+        os.replace(temp_path, path)
+        self.evict()
+        return path
+
+    def put_file(self, key, src_path):
+        """Copy an existing file into the cache."""
+        temp_path = self.temp_path(key)
+        shutil.copyfile(src_path, temp_path)
+        return self.commit(key, temp_path)
+
+    def put_bytes(self, key, data):
+        temp_path = self.temp_path(key)
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        return self.commit(key, temp_path)
+
+    # -----------------------------
+    # EVICTION
+    # -----------------------------
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue  # in-flight temp files
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_atime, st.st_size, path, st.st_mtime))
+        return entries
+
+    def size_bytes(self):
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(entry[1] for entry in self._entries())
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        with self._lock:
+            entries = self._entries()
+            total = sum(entry[1] for entry in entries)
+            expires_before = time.time() - self.ttl if self.ttl is not None else None
+            if total <= self.max_bytes and expires_before is None:
+                return 0
+
+            removed = 0
+            for _, size, path, written in sorted(entries):
+                expired = expires_before is not None and written < expires_before
+                if not expired and total <= self.max_bytes:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+
+        if removed:
+            logging.info(f"[Cache] Evicted {removed} entries from {self.directory}")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
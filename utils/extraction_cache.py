@@ -0,0 +1,169 @@
+"""
+Persistent cache for PDF extraction results
+
+Goals:
+- Re-uploading a PDF never re-extracts or re-OCRs it
+- Keyed by file SHA-256, with per-page content digests underneath, so a
+  revised document only re-extracts the pages that changed
+- One SQLite file, zlib-compressed page text, LRU eviction by size
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+EXTRACT_CACHE_PATH = os.path.join("cache", "extraction.sqlite3")
+EXTRACT_CACHE_MAX_MB = int(os.getenv("BSK_EXTRACT_CACHE_MB", "256"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    sha256 TEXT PRIMARY KEY,
+    page_digests TEXT NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    digest TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_by_access ON pages (last_access);
+"""
+
+
+class ExtractionCache:
+    """
+    documents: file SHA-256 → ordered page digests
+    pages: page digest → extracted lines (compressed JSON)
+
+    Identical pages shared by several documents are stored once.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._ready = True
+        return conn
+
+    @contextmanager
+    def _db(self):
+        conn = self._connect()
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    # -----------------------------
+    # READ
+    # -----------------------------
+    def document_pages(self, sha256):
+        """Page digests recorded for a file, or None."""
+        with self._db() as conn:
+            row = conn.execute(
+                "SELECT page_digests FROM documents WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE documents SET last_access = ? WHERE sha256 = ?",
+                (time.time(), sha256),
+            )
+        return json.loads(row[0])
+
+    def get_pages(self, digests):
+        """{digest: lines} for the cached subset of `digests`."""
+        found = {}
+        unique = list(dict.fromkeys(digests))
+        with self._db() as conn:
+            for i in range(0, len(unique), 500):  # SQLite variable limit
+                batch = unique[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                for digest, data in conn.execute(
+                    f"SELECT digest, data FROM pages WHERE digest IN ({marks})", batch
+                ):
+                    found[digest] = json.loads(zlib.decompress(data))
+                conn.execute(
+                    f"UPDATE pages SET last_access = ? WHERE digest IN ({marks})",
+                    [time.time(), *batch],
+                )
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    # -----------------------------
+    # WRITE
+    # -----------------------------
+    def put(self, sha256, digests, new_pages):
+        """Record a document's page order and any newly extracted pages."""
+        now = time.time()
+        with self._db() as conn:
+            for digest, lines in new_pages.items():
+                data = zlib.compress(json.dumps(lines, ensure_ascii=False).encode("utf-8"))
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                    (digest, data, len(data), now),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?)",
+                (sha256, json.dumps(digests), now),
+            )
+        self.evict()
+
+    # -----------------------------
+    # EVICTION
+    # -----------------------------
+    def size_bytes(self):
+        with self._db() as conn:
+            return conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM pages").fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used pages until under max_bytes."""
+        with self._lock, self._db() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM pages").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            cutoff = None
+            for digest, size, last_access in conn.execute(
+                "SELECT digest, bytes, last_access FROM pages ORDER BY last_access"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM pages WHERE digest = ?", (digest,))
+                total -= size
+                removed += 1
+                cutoff = last_access
+
+            # Documents not used since then point at evicted pages
+            conn.execute("DELETE FROM documents WHERE last_access <= ?", (cutoff,))
+
+        logging.info(f"[Cache] Evicted {removed} pages from {self.path}")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+extraction_cache = ExtractionCache(EXTRACT_CACHE_PATH, EXTRACT_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,230 @@
+"""
+Two-tier cache for slide images (images/ directory)
+
+Goals:
+- SQLite index of every cached file: query, Unsplash photo id and
+  attribution, byte size, last access
+- Negative caching: a query that failed is not retried until its
+  failure TTL expires
+- Disk budget with LRU eviction, so long-running containers stay bounded
+- Decoded pixels are kept in an in-process LRU on top of this
+  (video_utils.load_slide_image)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+IMAGE_CACHE_DIR = "images"
+IMAGE_INDEX_PATH = os.path.join("cache", "images.sqlite3")
+IMAGE_CACHE_MAX_MB = int(os.getenv("BSK_IMAGE_CACHE_MB", "512"))
+IMAGE_FAILURE_TTL_HOURS = float(os.getenv("BSK_IMAGE_FAILURE_TTL_HOURS", "24"))
+# Files looked up or stored this recently may still be rendered by a
+# running job (slides compose concurrently, segments render later in
+# worker processes), so eviction leaves them alone
+IMAGE_EVICT_GRACE_MINUTES = float(os.getenv("BSK_IMAGE_EVICT_GRACE_MINUTES", "60"))
+
+# Never indexed, never evicted
+PROTECTED_FILES = {"fallback_video.jpg"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    key TEXT PRIMARY KEY,
+    query TEXT,
+    path TEXT,
+    photo_id TEXT,
+    attribution TEXT,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL,
+    failed_until REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS images_by_access ON images (last_access);
+"""
+
+
+class ImageCache:
+    """
+    images: cache key (query + target size) → local file and its source
+
+    A row with failed_until in the future and no path is a negative
+    entry. Files already in the directory when the index is first
+    created are adopted, so they count against the budget too.
+    """
+
+    def __init__(self, directory, index_path, max_bytes, failure_ttl, grace=0):
+        self.directory = directory
+        self.index_path = index_path
+        self.max_bytes = max_bytes
+        self.failure_ttl = failure_ttl
+        self.grace = grace
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            with conn:
+                self._adopt(conn)
+            self._ready = True
+        return conn
+
+    @contextmanager
+    def _db(self):
+        conn = self._connect()
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def _adopt(self, conn):
+        """Index files written before the index existed (LRU by mtime)."""
+        known = {row[0] for row in conn.execute("SELECT path FROM images")}
+        for entry in os.scandir(self.directory):
+            if (
+                not entry.is_file()
+                or entry.name in PROTECTED_FILES
+                or not entry.name.endswith(".jpg")
+                or entry.path in known
+            ):
+                continue
+            st = entry.stat()
+            conn.execute(
+                "INSERT OR IGNORE INTO images (key, path, bytes, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (f"file:{entry.name}", entry.path, st.st_size, st.st_mtime),
+            )
+
+    # -----------------------------
+    # READ
+    # -----------------------------
+    def lookup(self, key):
+        """
+        ("hit", path), ("failed", None) inside a failure TTL,
+        or ("miss", None).
+        """
+        now = time.time()
+        with self._db() as conn:
+            row = conn.execute(
+                "SELECT path, failed_until FROM images WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                path, failed_until = row
+                if path and os.path.exists(path):
+                    conn.execute(
+                        "UPDATE images SET last_access = ? WHERE key = ?", (now, key)
+                    )
+                    outcome = ("hit", path)
+                elif not path and failed_until > now:
+                    outcome = ("failed", None)
+                else:
+                    # File removed behind our back, or failure expired
+                    conn.execute("DELETE FROM images WHERE key = ?", (key,))
+                    outcome = ("miss", None)
+            else:
+                outcome = ("miss", None)
+
+        with self._lock:
+            if outcome[0] == "hit":
+                self.hits += 1
+            elif outcome[0] == "failed":
+                self.negative_hits += 1
+            else:
+                self.misses += 1
+        return outcome
+
+    # -----------------------------
+    # WRITE
+    # -----------------------------
+    def put(self, key, query, path, photo_id=None, attribution=None):
+        """Record a cached file, then evict down to the disk budget."""
+        with self._db() as conn:
+            # An adopted row for the same file is superseded
+            conn.execute("DELETE FROM images WHERE path = ? AND key != ?", (path, key))
+            conn.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, query, path, photo_id, attribution,
+                 os.path.getsize(path), time.time()),
+            )
+        self.evict()
+        return path
+
+    def put_failure(self, key, query):
+        """Negative entry: `key` is not fetched again for failure_ttl."""
+        now = time.time()
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO images (key, query, last_access, failed_until) "
+                "VALUES (?, ?, ?, ?)",
+                (key, query, now, now + self.failure_ttl),
+            )
+
+    # -----------------------------
+    # EVICTION
+    # -----------------------------
+    def size_bytes(self):
+        with self._db() as conn:
+            return conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM images").fetchone()[0]
+
+    def evict(self):
+        """
+        Drop expired failures, then least recently used files until under
+        max_bytes. Files accessed within `grace` seconds are never removed,
+        so the cache may stay over budget while jobs are using them.
+        """
+        now = time.time()
+        with self._lock, self._db() as conn:
+            conn.execute(
+                "DELETE FROM images WHERE path IS NULL AND failed_until <= ?", (now,)
+            )
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM images").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for key, path, size in conn.execute(
+                "SELECT key, path, bytes FROM images WHERE path IS NOT NULL "
+                "AND last_access < ? ORDER BY last_access",
+                (now - self.grace,),
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                conn.execute("DELETE FROM images WHERE key = ?", (key,))
+                total -= size
+                removed += 1
+
+        logging.info(f"[Cache] Evicted {removed} images from {self.directory}")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+            }
+
+
+image_cache = ImageCache(
+    IMAGE_CACHE_DIR,
+    IMAGE_INDEX_PATH,
+    IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    IMAGE_FAILURE_TTL_HOURS * 3600,
+    grace=IMAGE_EVICT_GRACE_MINUTES * 60,
+)
+
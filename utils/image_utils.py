@@ -21,39 +21,45 @@ ASPECT_RATIO = TARGET_WIDTH / TARGET_HEIGHT
 # -------------------------------------------------
 # CORE IMAGE PROCESSOR
 # -------------------------------------------------
-def prepare_slide_image(image_path):
+def prepare_slide_image(image_path, size=(TARGET_WIDTH, TARGET_HEIGHT), output_path=None):
     """
     Prepare an image for video slide usage:
-    - Center crop to 16:9
-    - Resize to 1280x720
+    - Center crop to the aspect ratio of `size` (16:9 by default)
+    - Resize to `size` (1280x720 by default)
     - Enhance contrast slightly
+    Saved to output_path, or <image>_video.jpg next to the source.
     """
 
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"Image not found: {image_path}")
 
-    with Image.open(image_path).convert("RGB") as img:
+    target_width, target_height = size
+    aspect_ratio = target_width / target_height
+
+    with Image.open(image_path) as opened:
+        img = opened.convert("RGB")
         img_width, img_height = img.size
         img_ratio = img_width / img_height
 
         # -----------------------------
-        # CENTER CROP TO 16:9
+        # CENTER CROP TO TARGET ASPECT
         # -----------------------------
-        if img_ratio > ASPECT_RATIO:
-            # Image is wider than 16:9 → crop sides
-            new_width = int(img_height * ASPECT_RATIO)
+        if img_ratio > aspect_ratio:
+            # Image is wider than the target → crop sides
+            new_width = int(img_height * aspect_ratio)
             left = (img_width - new_width) // 2
             img = img.crop((left, 0, left + new_width, img_height))
         else:
-            # Image is taller than 16:9 → crop top/bottom
-            new_height = int(img_width / ASPECT_RATIO)
+            # Image is taller than the target → crop top/bottom
+            new_height = int(img_width / aspect_ratio)
             top = (img_height - new_height) // 2
             img = img.crop((0, top, img_width, top + new_height))
 
         # -----------------------------
         # RESIZE FOR VIDEO
         # -----------------------------
-        img = img.resize((TARGET_WIDTH, TARGET_HEIGHT), Image.LANCZOS)
+        if img.size != (target_width, target_height):
+            img = img.resize((target_width, target_height), Image.LANCZOS)
 
         # -----------------------------
         # LIGHT ENHANCEMENT (SAFE)
@@ -64,8 +70,11 @@ def prepare_slide_image(image_path):
         # -----------------------------
         # SAVE PROCESSED IMAGE
         # -----------------------------
-        base, _ = os.path.splitext(image_path)
-        processed_path = f"{base}_video.jpg"
+        if output_path:
+            processed_path = output_path
+        else:
+            base, _ = os.path.splitext(image_path)
+            processed_path = f"{base}_video.jpg"
         img.save(processed_path, "JPEG", quality=92, subsampling=0)
 
         return processed_path
@@ -0,0 +1,125 @@
+"""
+Line deduplication for merged text-layer + OCR output
+
+Goals:
+- Exact duplicates found with a hashed set of normalized lines (O(1))
+- Near duplicates (OCR noise: "Appl1cation" vs "Application") found with
+  MinHash signatures + LSH buckets, so candidates stay O(1) per line
+- Reading order preserved; dropped lines counted
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+SHINGLE = 3  # character n-gram size
+NUM_PERM = 32  # MinHash signature length
+BANDS = 8  # LSH bands (NUM_PERM / BANDS rows each)
+NEAR_DUP_JACCARD = 0.7  # shingle-set similarity that counts as the same line
+MIN_NEAR_DUP_CHARS = 12  # shorter lines are only matched exactly
+
+_MERSENNE = (1 << 61) - 1
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 31, NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, NUM_PERM).astype(np.uint64)
+
+
+def normalize_line(line: str) -> str:
+    return " ".join(re.findall(r"\w+", line.lower()))
+
+
+def shingles(text: str):
+    if len(text) <= SHINGLE:
+        return {text}
+    return {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+
+
+def minhash(shingle_set):
+    hashes = np.array(
+        [zlib.crc32(s.encode("utf-8")) for s in shingle_set], dtype=np.uint64
+    )
+    # (a * x + b) mod p for every permutation × shingle, min per permutation
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE
+    return permuted.min(axis=1)
+
+
+def _numbers(key: str) -> str:
+    """Numeric tokens of a line (OCR slips like "Appl1cation" don't count)."""
+    return " ".join(
+        token for token in key.split()
+        if 2 * sum(ch.isdigit() for ch in token) > len(token)
+    )
+
+
+class LineDeduper:
+    """
+    Accepts lines in reading order; add() says whether a line is new.
+    """
+
+    def __init__(self):
+        self._exact = set()
+        self._shingles = []  # (shingle set, digits) per near-dup candidate
+        self._buckets = {}  # (band, band signature) → candidate ids
+        self.dropped = 0
+
+    def _bands(self, signature):
+        rows = NUM_PERM // BANDS
+        return [
+            (band, signature[band * rows:(band + 1) * rows].tobytes())
+            for band in range(BANDS)
+        ]
+
+    def add(self, line: str, keep_duplicates: bool = False) -> bool:
+        """
+        Register `line`; False if it duplicates an earlier line.
+        keep_duplicates registers it without dropping (trusted text layer).
+        """
+        key = normalize_line(line)
+        if not key:
+            return keep_duplicates
+
+        if key in self._exact:
+            if not keep_duplicates:
+                self.dropped += 1
+            return keep_duplicates
+        self._exact.add(key)
+
+        if len(key) < MIN_NEAR_DUP_CHARS:
+            return True
+
+        grams = shingles(key)
+        # Lines that differ in any number (fees, dates, counts) are never merged
+        digits = _numbers(key)
+        bands = self._bands(minhash(grams))
+        if not keep_duplicates:
+            candidates = {c for b in bands for c in self._buckets.get(b, ())}
+            for c in candidates:
+                other, other_digits = self._shingles[c]
+                if (
+                    other_digits == digits
+                    and len(grams & other) / len(grams | other) >= NEAR_DUP_JACCARD
+                ):
+                    self.dropped += 1
+                    return False
+
+        self._shingles.append((grams, digits))
+        for b in bands:
+            self._buckets.setdefault(b, []).append(len(self._shingles) - 1)
+        return True
+
+
+def merge_lines(text_lines, ocr_lines):
+    """
+    Text-layer lines (all kept) followed by the OCR lines that add
+    something new. Returns (lines, dropped_count).
+    """
+    deduper = LineDeduper()
+    merged = []
+    for line in text_lines:
+        deduper.add(line, keep_duplicates=True)
+        merged.append(line)
+    for line in ocr_lines:
+        if deduper.add(line):
+            merged.append(line)
+    return merged, deduper.dropped
@@ -2,15 +2,39 @@
 import fitz
 import pytesseract
 from PIL import Image
+import hashlib
+import logging
+import multiprocessing
 import re
 import shutil
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.extraction_cache import extraction_cache
+from utils.line_dedup import merge_lines
 
 # -------------------------------------------------
 # CONFIG
 # -------------------------------------------------
 
-OCR_DPI = 300
+# OCR resolution adapts to glyph size (see ocr_dpi)
+MIN_OCR_DPI = 100
+MAX_OCR_DPI = 300
+TARGET_GLYPH_PX = 32  # Tesseract is most accurate around 20–40px glyphs
+DEFAULT_GLYPH_PT = 10  # assumed body size when a page has no text layer
+
+# Image placements smaller than this share of the page (logos, seals,
+# signatures) are never OCR'd
+MIN_OCR_AREA = 0.05
+# An image this much covered by text blocks already has a text layer
+TEXT_COVERAGE = 0.5
+
+# Small documents are extracted inline: a process pool costs more to start
+INLINE_PAGES = 4
+
+# Bump when extraction output changes: cached pages are keyed on it
+EXTRACTOR_VERSION = 3
 
 # Explicit path (Windows-safe)
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
@@ -27,47 +51,267 @@ def clean_line(text):
 
 
 # -------------------------------------------------
-# OCR PAGE (RAW)
+# SELECTIVE OCR
 # -------------------------------------------------
-def ocr_page(page):
+def ocr_dpi(glyph_pt, native_dpi=None):
+    """
+    Render resolution that makes glyphs ~TARGET_GLYPH_PX tall, never
+    above the embedded image's own resolution (upsampling adds nothing).
+    """
+    dpi = TARGET_GLYPH_PX * 72 / max(glyph_pt, 1)
+    if native_dpi:
+        dpi = min(dpi, max(native_dpi, MIN_OCR_DPI))
+    return int(min(max(dpi, MIN_OCR_DPI), MAX_OCR_DPI))
+
+
+def _median_font_size(page):
+    sizes = [
+        span["size"]
+        for block in page.get_text("dict")["blocks"]
+        for line in block.get("lines", [])
+        for span in line["spans"]
+        if span["text"].strip()
+    ]
+    if not sizes:
+        return DEFAULT_GLYPH_PT
+    sizes.sort()
+    return sizes[len(sizes) // 2]
+
+
+def ocr_regions(page, has_text):
+    """
+    Image areas worth OCR'ing: (clip rect, native dpi) pairs.
+    Skips small images and images already overlaid by a text layer.
+    A page without any text layer or image is OCR'd whole.
+    """
+    page_rect = page.rect
+    page_area = abs(page_rect)
+    text_rects = [fitz.Rect(b[:4]) for b in page.get_text("blocks") if b[4].strip()]
+
+    regions = []
+    for info in page.get_image_info():
+        rect = fitz.Rect(info["bbox"]) & page_rect
+        if rect.is_empty or abs(rect) < MIN_OCR_AREA * page_area:
+            continue
+        covered = sum(abs(rect & t) for t in text_rects)
+        if covered >= TEXT_COVERAGE * abs(rect):
+            continue
+        native_dpi = info["width"] / (rect.width / 72) if rect.width else None
+        regions.append((rect, native_dpi))
+
+    if not regions and not has_text:
+        regions.append((page_rect, None))
+    return regions
+
+
+def ocr_region(page, clip=None, dpi=MAX_OCR_DPI):
     if not OCR_AVAILABLE:
         return []
 
-    pix = page.get_pixmap(dpi=OCR_DPI)
+    pix = page.get_pixmap(dpi=dpi, clip=clip)
     img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
     text = pytesseract.image_to_string(img)
 
     return [clean_line(l) for l in text.split("\n") if clean_line(l)]
 
 
+def ocr_page(page):
+    return ocr_region(page, dpi=ocr_dpi(DEFAULT_GLYPH_PT))
+
+
+# -------------------------------------------------
+# PAGE WORKER (ONE fitz DOCUMENT PER PROCESS)
+# -------------------------------------------------
+_open_doc = {}
+
+
+def _document(pdf_path):
+    if _open_doc.get("path") != pdf_path:
+        if "doc" in _open_doc:
+            _open_doc["doc"].close()
+        _open_doc.update(path=pdf_path, doc=fitz.open(pdf_path))
+    return _open_doc["doc"]
+
+
+def extract_page(page):
+    """Text layer + OCR of image-only regions for one fitz page."""
+    start = time.perf_counter()
+    page_lines = []
+
+    # Normal text extraction
+    text = page.get_text("text")
+    for line in text.split("\n"):
+        line = clean_line(line)
+        if line:
+            page_lines.append(line)
+    text_s = time.perf_counter() - start
+
+    # OCR fallback (ONLY image regions without a text layer)
+    regions = ocr_regions(page, bool(page_lines)) if OCR_AVAILABLE else []
+    glyph_pt = _median_font_size(page) if regions and page_lines else DEFAULT_GLYPH_PT
+    ocr_lines = []
+    for clip, native_dpi in regions:
+        ocr_lines.extend(ocr_region(page, clip, ocr_dpi(glyph_pt, native_dpi)))
+
+    # OCR lines only where they add something (exact + near-duplicate check)
+    page_lines, dropped = merge_lines(page_lines, ocr_lines)
+
+    return {
+        "page": page.number + 1,
+        "lines": page_lines,
+        "dropped_lines": dropped,
+        "timings": {
+            "text": round(text_s, 3),
+            "ocr": round(time.perf_counter() - start - text_s, 3),
+            "ocr_regions": len(regions),
+        },
+    }
+
+
+def _extract_pages(pdf_path, page_numbers):
+    """Process-pool worker: a contiguous run of pages from one document."""
+    doc = _document(pdf_path)
+    return [extract_page(doc[i]) for i in page_numbers]
+
+
+# -------------------------------------------------
+# CACHE KEYS
+# -------------------------------------------------
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+_XREF_REF = re.compile(r"(\d+)\s+0\s+R")
+
+
+def _xobject_xrefs(doc, page):
+    """
+    Every XObject (image or form) the page draws, in a stable order,
+    including XObjects nested inside Form XObjects at any depth.
+    """
+    pending = [img[0] for img in page.get_images(full=True)]
+    pending += [xobj[0] for xobj in page.get_xobjects()]
+    seen = []
+    while pending:
+        xref = pending.pop(0)
+        if xref <= 0 or xref in seen:
+            continue
+        seen.append(xref)
+        kind, value = doc.xref_get_key(xref, "Resources/XObject")
+        if kind == "xref":
+            kind, value = "dict", doc.xref_object(int(value.split()[0]), compressed=True)
+        if kind == "dict":
+            pending += [int(ref) for ref in _XREF_REF.findall(value)]
+    return seen
+
+
+def page_digest(doc, page):
+    """
+    Digest of everything a page's extraction depends on: its content
+    stream, every XObject stream it draws (images, and forms whose text
+    never appears in the page's own content stream), fonts, geometry
+    and OCR availability. Unchanged pages of a revised PDF keep their
+    digest.
+    """
+    h = hashlib.sha256(f"v{EXTRACTOR_VERSION}:ocr={OCR_AVAILABLE}".encode())
+    h.update(f"{tuple(page.rect)}:{page.rotation}".encode())
+    h.update(page.read_contents())
+    for xref in _xobject_xrefs(doc, page):
+        h.update(doc.xref_stream_raw(xref) or b"")
+    for font in page.get_fonts(full=True):
+        h.update(repr(font[1:6]).encode())
+    return h.hexdigest()
+
+
 # -------------------------------------------------
 # RAW EXTRACTION (TEXT + OCR)
 # -------------------------------------------------
-def extract_raw_content(pdf_path):
-    doc = fitz.open(pdf_path)
-    pages = []
+def _cached_page(page_no, lines):
+    return {
+        "page": page_no,
+        "lines": lines,
+        "dropped_lines": 0,
+        "timings": {"text": 0.0, "ocr": 0.0, "ocr_regions": 0, "cached": True},
+    }
+
+
+def _extract_uncached(pdf_path, page_numbers, workers):
+    """Extract the given 0-based pages, in a process pool when worthwhile."""
+    if len(page_numbers) <= INLINE_PAGES:
+        with fitz.open(pdf_path) as doc:
+            return [extract_page(doc[i]) for i in page_numbers]
 
-    for page_no, page in enumerate(doc, start=1):
-        page_lines = []
+    workers = workers or min(len(page_numbers), os.cpu_count() or 1)
+    # Contiguous runs (~2 per worker): one fitz document per process
+    run_len = -(-len(page_numbers) // (workers * 2))
+    runs = [page_numbers[i:i + run_len] for i in range(0, len(page_numbers), run_len)]
+    # spawn: the Streamlit server is multi-threaded, forking it is unsafe
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return [
+            page
+            for run in pool.map(_extract_pages, [pdf_path] * len(runs), runs)
+            for page in run
+        ]
 
-        # Normal text extraction
-        text = page.get_text("text")
-        for line in text.split("\n"):
-            line = clean_line(line)
-            if line:
-                page_lines.append(line)
 
-        # OCR fallback (ONLY if needed)
-        if OCR_AVAILABLE and (len(page_lines) < 10 or page.get_images()):
-            ocr_lines = ocr_page(page)
+def extract_raw_content(pdf_path, workers=None, use_cache=True):
+    """
+    Extract every page's lines, pages spread over a process pool.
 
-            # Append OCR lines without deduping aggressively
-            for l in ocr_lines:
-                if l not in page_lines:
-                    page_lines.append(l)
+    With use_cache, a known file is served from the extraction cache
+    without opening it, and a revised file only re-extracts the pages
+    whose content digest changed.
 
-        pages.append({"page": page_no, "lines": page_lines})
+    Output: [{"page", "lines", "dropped_lines",
+              "timings": {"text", "ocr", "ocr_regions"}}] in page order.
+    """
+    start = time.perf_counter()
+    sha = file_sha256(pdf_path) if use_cache else None
 
+    if use_cache:
+        digests = extraction_cache.document_pages(sha)
+        if digests is not None:
+            cached = extraction_cache.get_pages(digests)
+            if all(d in cached for d in digests):
+                logging.info(f"[PDF] {len(digests)} pages served from extraction cache")
+                return [_cached_page(i, cached[d]) for i, d in enumerate(digests, start=1)]
+
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        digests = [page_digest(doc, page) for page in doc] if use_cache else []
+
+    cached = extraction_cache.get_pages(digests) if use_cache else {}
+    missing = [i for i in range(page_count) if not use_cache or digests[i] not in cached]
+    extracted = {page["page"] - 1: page for page in _extract_uncached(pdf_path, missing, workers)}
+
+    pages = [
+        extracted[i] if i in extracted else _cached_page(i + 1, cached[digests[i]])
+        for i in range(page_count)
+    ]
+    if use_cache:
+        extraction_cache.put(
+            sha, digests, {digests[i]: page["lines"] for i, page in extracted.items()}
+        )
+
+    for page in pages:
+        t = page["timings"]
+        logging.info(
+            f"[PDF] Page {page['page']}: {len(page['lines'])} lines, "
+            f"text {t['text']:.2f}s, OCR {t['ocr']:.2f}s ({t['ocr_regions']} regions), "
+            f"{page['dropped_lines']} duplicate lines dropped"
+            + (" [cached]" if t.get("cached") else "")
+        )
+    logging.info(
+        f"[PDF] Extracted {len(missing)} of {page_count} pages "
+        f"in {time.perf_counter() - start:.2f}s, "
+        f"{sum(p['dropped_lines'] for p in pages)} duplicate lines dropped"
+    )
     return pages
 
 
@@ -0,0 +1,207 @@
+"""
+Slide pipeline for training video generation
+
+Goals:
+- Fan out every slide at once instead of walking them one by one
+- All narrations run as ONE bounded, retrying TTS batch on one event loop
+- Image fetches run on a thread pool
+- Each slide is composed as soon as its audio and image are ready
+- Slides may stream in (e.g. from the LLM): work starts per slide on arrival
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.audio_utils import synthesize_batch_async, write_audio_manifest
+from utils.subtitle_utils import bullet_timing_index
+from utils.video_utils import SLIDE_IMAGE_SIZE, create_slide
+from services.unsplash_service import (
+    PREFETCH_WORKERS, fallback_image, fetch_and_save_photo, normalize_query,
+)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+IMAGE_WORKERS = PREFETCH_WORKERS  # I/O bound; matches the HTTP pool size
+COMPOSE_WORKERS = 4  # Slide composition is mostly PIL / ffmpeg probing
+DEFAULT_BACKGROUND = os.path.join("assets", "default_background.jpg")
+
+
+# -------------------------------------------------
+# IMAGE STAGE (THREAD POOL)
+# -------------------------------------------------
+def fetch_slide_image(keyword):
+    """
+    Fetch the image for one slide, already sized for the slide layout.
+    Never raises: falls back to a plain background image.
+    """
+    try:
+        return fetch_and_save_photo(keyword, size=SLIDE_IMAGE_SIZE)
+    except Exception as img_error:
+        logging.warning(f"Image fetch failed: {img_error}. Using fallback.")
+        path = fallback_image()
+        return path if os.path.exists(path) else DEFAULT_BACKGROUND
+
+
+# -------------------------------------------------
+# COMPOSE STAGE (THREAD POOL)
+# -------------------------------------------------
+def compose_slide(slide, image, audio):
+    """
+    Build the MoviePy clip for one slide once its assets exist.
+    `audio` is the slide's TTS manifest entry; create_slide adds the
+    avatar, and the narration is mixed once at render time.
+    """
+    return create_slide(slide["title"], slide["bullets"], image, audio)
+
+
+# -------------------------------------------------
+# PER-SLIDE COROUTINE
+# -------------------------------------------------
+async def _finish_slide(index, slide, audio_ready, image_ready, compose, compose_pool):
+    loop = asyncio.get_running_loop()
+
+    tts = await audio_ready
+    image = await image_ready
+
+    clip = None
+    if compose:
+        clip = await loop.run_in_executor(
+            compose_pool, compose_slide, slide, image, tts
+        )
+
+    return {
+        "index": index,
+        "title": slide["title"],
+        "bullets": slide["bullets"],
+        "image": image,
+        "audio": tts["path"],
+        "tts": tts,
+        "clip": clip,
+    }
+
+
+async def _iterate_in_thread(iterable, pool):
+    """Drain a blocking iterator (e.g. a streaming LLM response) off the loop."""
+    loop = asyncio.get_running_loop()
+    iterator = iter(iterable)
+    done = object()
+    while True:
+        item = await loop.run_in_executor(pool, next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+async def _run_pipeline(slides, voice, compose, workspace, on_slide_ready):
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(IMAGE_WORKERS) as image_pool, ThreadPoolExecutor(
+        COMPOSE_WORKERS
+    ) as compose_pool, ThreadPoolExecutor(1) as source_pool:
+        received = []
+        audio_futures = []
+        slide_tasks = []
+        image_jobs = {}  # normalized keyword → fetch future (shared by slides)
+        arrived = asyncio.Event()  # wakes the wait loop for a new slide task
+
+        async def narrations():
+            # Each slide fans out (image, TTS, compose) the moment it arrives
+            async for slide in _iterate_in_thread(slides, source_pool):
+                index = len(received)
+                received.append(slide)
+                audio_futures.append(loop.create_future())
+                keyword = normalize_query(slide["image_keyword"] or "")
+                if keyword not in image_jobs:
+                    image_jobs[keyword] = loop.run_in_executor(
+                        image_pool, fetch_slide_image, slide["image_keyword"]
+                    )
+                image_ready = image_jobs[keyword]
+                slide_tasks.append(
+                    asyncio.create_task(
+                        _finish_slide(
+                            index, slide, audio_futures[index], image_ready,
+                            compose, compose_pool,
+                        )
+                    )
+                )
+                arrived.set()
+                yield " ".join(slide["bullets"])
+
+        def on_audio(result):
+            # Word boundaries → per-bullet timing index (reveal times, subtitles)
+            bullets = received[result["index"]]["bullets"]
+            result.update(bullet_timing_index(bullets, result["words"]))
+            audio_futures[result["index"]].set_result(result)
+
+        # One TTS batch for the whole deck; each slide wakes up on its own result
+        tts_task = asyncio.create_task(
+            synthesize_batch_async(
+                narrations(),
+                voice=voice,
+                workspace=workspace,
+                on_result=on_audio,
+            )
+        )
+
+        # Report slides in completion order, return them in deck order.
+        # The TTS task finishes only once the slide source is exhausted, so
+        # `total` is exact from then on; it also surfaces source/TTS errors.
+        reported = set()
+        while not tts_task.done() or len(reported) < len(slide_tasks):
+            arrived.clear()
+            arrival = asyncio.ensure_future(arrived.wait())
+            waiting = {task for task in slide_tasks if task not in reported}
+            waiting.add(arrival)
+            if not tts_task.done():
+                waiting.add(tts_task)
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            arrival.cancel()
+            for task in done:
+                if task is arrival:
+                    continue
+                result = task.result()
+                if task is tts_task:
+                    continue
+                reported.add(task)
+                if on_slide_ready:
+                    on_slide_ready(result, len(reported), len(slide_tasks))
+
+        results = [task.result() for task in slide_tasks]
+
+    # Record of the TTS stage kept with the job's files; rendering uses the
+    # in-memory entries (slide["tts"]) and never probes the audio again
+    if workspace is not None and results:
+        manifest_path = workspace.new_file(".json", kind="manifest")
+        write_audio_manifest([r["tts"] for r in results], manifest_path)
+        workspace.commit(manifest_path)
+
+    return results
+
+
+# -------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------
+def run_slide_pipeline(slides, voice, compose=True, workspace=None, on_slide_ready=None):
+    """
+    Render every slide of a deck concurrently.
+
+    Input:
+    - slides: LLM slide dicts (title, bullets, image_keyword); a list or any
+      iterator, e.g. SlideGenerator.stream() so slide 1 starts rendering
+      while later slides are still being generated
+    - voice: edge-tts voice name
+    - compose: build MoviePy clips here; pass False when slides are
+      rendered elsewhere (e.g. the segmented process-pool render)
+    - workspace: optional JobWorkspace owning the narration files
+    - on_slide_ready(result, done, total): optional progress callback,
+      called on the caller's thread as each slide finishes
+    Output:
+    - list of per-slide dicts (title, bullets, image, audio, tts, clip)
+      in the same order as `slides`; "clip" is None when compose=False
+    """
+    return asyncio.run(
+        _run_pipeline(slides, voice, compose, workspace, on_slide_ready)
+    )
@@ -0,0 +1,258 @@
+"""
+Slide rasterizer for training video generation
+
+Goals:
+- Flatten every static slide layer ONCE into a single RGB frame
+- Blend only the time-varying layers (fade-ins) per frame
+- Reuse identical frames once every animation has settled
+- Composite at a reduced rate between animations (quantize_static)
+"""
+
+import math
+
+import numpy as np
+from PIL import Image
+from moviepy.editor import VideoClip
+
+
+# -------------------------------------------------
+# PIXEL HELPERS
+# -------------------------------------------------
+def load_rgba(source, height=None):
+    """
+    Load an image path / PIL image / array as a float32 RGBA array (0-255).
+    Optionally resize to a fixed height (aspect preserved, LANCZOS).
+    """
+    if isinstance(source, np.ndarray):
+        img = Image.fromarray(source)
+    elif isinstance(source, Image.Image):
+        img = source
+    else:
+        with Image.open(source) as opened:
+            img = opened.convert("RGBA")
+
+    img = img.convert("RGBA")
+    if height and img.height != height:
+        width = max(1, round(img.width * height / img.height))
+        img = img.resize((width, height), Image.LANCZOS)
+
+    return np.asarray(img, dtype=np.float32)
+
+
+class _TimedLayer:
+    """A layer that appears at `start` and fades in from black over `fadein`."""
+
+    def __init__(self, premultiplied, inv_alpha, region, start, fadein):
+        self.premultiplied = premultiplied
+        self.inv_alpha = inv_alpha
+        self.region = region
+        self.start = start
+        self.fadein = fadein
+
+    def factor(self, t):
+        if t < self.start:
+            return None
+        if self.fadein <= 0:
+            return 1.0
+        return min(1.0, (t - self.start) / self.fadein)
+
+
+# -------------------------------------------------
+# RASTERIZER
+# -------------------------------------------------
+class SlideRaster:
+    """
+    Pre-flattened slide: one static RGB base + a few timed layers.
+
+    Fades follow MoviePy's vfx.fadein / vfx.fadeout, which fade colour
+    from black rather than fading alpha. Timed layers are always drawn
+    above the static base; the slide layout keeps them apart.
+    """
+
+    def __init__(self, width, height, background, bg_fade=0.0):
+        self.width = width
+        self.height = height
+        self.bg_fade = bg_fade
+
+        # Compositing is linear in the background colour, so a background
+        # fade is an interpolation between a lit and a black base
+        self._base = np.empty((height, width, 3), dtype=np.float32)
+        self._base[:] = background
+        self._base_dark = np.zeros_like(self._base)
+
+        self._layers = []
+        self._frame_cache = {}
+
+    # -----------------------------
+    # LAYER BUILDING
+    # -----------------------------
+    def _region(self, shape, position):
+        h, w = shape[:2]
+        x, y = position
+        if x == "center":
+            x = (self.width - w) // 2
+        if y == "center":
+            y = (self.height - h) // 2
+        x, y = int(x), int(y)
+
+        # Clip against the frame (e.g. images overhanging the right edge)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, self.width), min(y + h, self.height)
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        frame_slice = (slice(y0, y1), slice(x0, x1))
+        layer_slice = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        return frame_slice, layer_slice
+
+    def add_fill(self, color, opacity=1.0):
+        """Static full-frame colour wash (e.g. a darkening overlay)."""
+        color = np.asarray(color, dtype=np.float32)
+        for base in (self._base, self._base_dark):
+            base *= 1.0 - opacity
+            base += color * opacity
+
+    def add_layer(self, rgba, position, start=0.0, fadein=0.0, opacity=1.0):
+        """
+        Add an RGBA layer. Layers visible from t=0 without a fade are
+        flattened into the base immediately; the rest are blended per frame.
+        """
+        region = self._region(rgba.shape, position)
+        if region is None:
+            return
+        frame_slice, layer_slice = region
+
+        cropped = rgba[layer_slice]
+        alpha = cropped[..., 3:4] * (opacity / 255.0)
+        premultiplied = cropped[..., :3] * alpha
+        inv_alpha = 1.0 - alpha
+
+        if start <= 0 and fadein <= 0:
+            for base in (self._base, self._base_dark):
+                target = base[frame_slice]
+                target *= inv_alpha
+                target += premultiplied
+            return
+
+        self._layers.append(
+            _TimedLayer(premultiplied, inv_alpha, frame_slice, start, fadein)
+        )
+
+    # -----------------------------
+    # FRAME GENERATION
+    # -----------------------------
+    def _background_factor(self, t, duration):
+        if self.bg_fade <= 0:
+            return 1.0
+        return max(0.0, min(1.0, t / self.bg_fade, (duration - t) / self.bg_fade))
+
+    def make_frame(self, t, duration):
+        k = self._background_factor(t, duration)
+        factors = tuple(layer.factor(t) for layer in self._layers)
+
+        # Settled states (no fade in progress) always produce the same frame
+        settled = k in (0.0, 1.0) and all(f in (None, 1.0) for f in factors)
+        key = (k, factors)
+        if settled and key in self._frame_cache:
+            return self._frame_cache[key]
+
+        if k >= 1.0:
+            frame = self._base.copy()
+        elif k <= 0.0:
+            frame = self._base_dark.copy()
+        else:
+            frame = self._base_dark + k * (self._base - self._base_dark)
+
+        for layer, f in zip(self._layers, factors):
+            if f is None:
+                continue
+            target = frame[layer.region]
+            target *= layer.inv_alpha
+            target += layer.premultiplied * f
+
+        frame = np.clip(frame, 0, 255).astype(np.uint8)
+
+        if settled:
+            frame.flags.writeable = False
+            self._frame_cache[key] = frame
+        return frame
+
+    def dynamic_intervals(self, duration):
+        """
+        (start, end) spans in which frames change: background fades and
+        layer fade-ins. A layer without a fade gives a zero-length span
+        at the moment it pops in.
+        """
+        spans = [(layer.start, layer.start + layer.fadein) for layer in self._layers]
+        if self.bg_fade > 0:
+            spans += [(0.0, self.bg_fade), (duration - self.bg_fade, duration)]
+        return spans
+
+    def to_clip(self, duration):
+        """Wrap the rasterized slide as a MoviePy clip."""
+        return VideoClip(lambda t: self.make_frame(t, duration), duration=duration)
+
+
+# -------------------------------------------------
+# REDUCED-RATE STATIC INTERVALS
+# -------------------------------------------------
+def _merge_spans(spans):
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def quantize_static(clip, dynamic_spans, static_fps):
+    """
+    Composite `clip` at full rate inside `dynamic_spans` and at
+    `static_fps` everywhere else.
+
+    Between spans, t is snapped down to a 1/static_fps grid that starts
+    where the previous span ended, and the last composited frame is
+    returned while t stays on the same grid step. The encoder still gets
+    a constant-rate stream; the repeated frames are bit-identical, so
+    x264 codes them as skip blocks for almost no bits. Only slow
+    continuous motion (the avatar's breathing and sway, a few pixels per
+    second) is sampled at the lower rate.
+
+    The returned clip has `frame_stats` = {"frames", "composited"}.
+    """
+    spans = _merge_spans(dynamic_spans)
+    step = 1.0 / static_fps
+    stats = {"frames": 0, "composited": 0}
+
+    def quantize(t):
+        static_start = 0.0
+        for start, end in spans:
+            if t < start:
+                break
+            if t <= end:
+                return t  # animation in progress: full rate
+            static_start = end
+        return static_start + math.floor((t - static_start) / step) * step
+
+    def memoized(count):
+        last = {}
+
+        def filter_frame(get_frame, t):
+            q = quantize(t)
+            if count:
+                stats["frames"] += 1
+            if last.get("t") != q:
+                if count:
+                    stats["composited"] += 1
+                last["t"] = q
+                last["frame"] = get_frame(q)
+            return last["frame"]
+
+        return filter_frame
+
+    quantized = clip.fl(memoized(count=True))
+    if clip.mask is not None:
+        quantized.mask = clip.mask.fl(memoized(count=False))
+    quantized.frame_stats = stats
+    return quantized
@@ -0,0 +1,158 @@
+"""
+Subtitle + bullet timing utilities for training video generation
+
+Goals:
+- Align edge-tts word boundaries with the slide bullets (no ASR pass)
+- Reveal each bullet when the narrator reaches it
+- Write SRT and WebVTT sidecars straight from the same timings
+"""
+
+import os
+import re
+
+MAX_CUE_WORDS = 8
+MAX_CUE_CHARS = 42
+ALIGN_LOOKAHEAD = 6  # tokens a spoken word may skip (e.g. "₹50" → "50 rupees")
+
+
+# -------------------------------------------------
+# WORD ↔ BULLET ALIGNMENT
+# -------------------------------------------------
+def _tokens(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def align_words_to_bullets(bullets, words):
+    """
+    Map every word boundary to the bullet it was spoken in.
+    Returns one bullet index per word (same length as `words`).
+    """
+    expected = []  # (token, bullet index) in narration order
+    for i, bullet in enumerate(bullets):
+        expected.extend((token, i) for token in _tokens(bullet))
+
+    owners = []
+    pos = 0
+    current = 0
+    for word in words:
+        spoken = _tokens(word["text"])
+        if spoken:
+            window = expected[pos:pos + ALIGN_LOOKAHEAD]
+            for offset, (token, bullet) in enumerate(window):
+                if token == spoken[0]:
+                    current = bullet
+                    pos += offset + len(spoken)
+                    break
+        owners.append(current)
+    return owners
+
+
+def bullet_start_times(bullets, words, owners=None):
+    """
+    Time (s) at which the narrator starts each bullet, or None for a
+    bullet with no matched words.
+    """
+    if owners is None:
+        owners = align_words_to_bullets(bullets, words)
+    starts = [None] * len(bullets)
+    for word, bullet in zip(words, owners):
+        if starts[bullet] is None:
+            starts[bullet] = word["start"]
+    return starts
+
+
+def bullet_timing_index(bullets, words):
+    """Per-slide timing index stored alongside the audio manifest entry."""
+    owners = align_words_to_bullets(bullets, words)
+    return {
+        "word_bullets": owners,
+        "bullet_starts": bullet_start_times(bullets, words, owners),
+    }
+
+
+# -------------------------------------------------
+# CUES
+# -------------------------------------------------
+def build_cues(audio_entries, starts):
+    """
+    Group word boundaries into short subtitle cues.
+    A cue never spans two bullets or two slides.
+    """
+    cues = []
+    for entry, offset in zip(audio_entries, starts):
+        words = entry.get("words") or []
+        owners = entry.get("word_bullets") or [0] * len(words)
+
+        group = []
+        for word, bullet in zip(words, owners):
+            text = " ".join(w["text"] for w in group + [word])
+            if group and (
+                bullet != group_bullet
+                or len(group) >= MAX_CUE_WORDS
+                or len(text) > MAX_CUE_CHARS
+            ):
+                cues.append(_cue(group, offset))
+                group = []
+            if not group:
+                group_bullet = bullet
+            group.append(word)
+        if group:
+            cues.append(_cue(group, offset))
+    return cues
+
+
+def _cue(words, offset):
+    return {
+        "start": offset + words[0]["start"],
+        "end": offset + words[-1]["end"],
+        "text": " ".join(w["text"] for w in words),
+    }
+
+
+# -------------------------------------------------
+# WRITERS
+# -------------------------------------------------
+def format_timestamp(seconds, decimal=","):
+    millis = int(round(max(seconds, 0) * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{decimal}{millis:03d}"
+
+
+def write_srt(cues, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, cue in enumerate(cues, start=1):
+            f.write(
+                f"{i}\n{format_timestamp(cue['start'])} --> "
+                f"{format_timestamp(cue['end'])}\n{cue['text']}\n\n"
+            )
+    return path
+
+
+def write_vtt(cues, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+        for cue in cues:
+            f.write(
+                f"{format_timestamp(cue['start'], '.')} --> "
+                f"{format_timestamp(cue['end'], '.')}\n{cue['text']}\n\n"
+            )
+    return path
+
+
+def write_subtitle_sidecars(video_path, audio_entries, starts):
+    """
+    Write <video>.srt and <video>.vtt next to the rendered video.
+    Returns the SRT path, or None when no word timings are available
+    (sidecars left by an earlier render of the same path are removed).
+    """
+    cues = build_cues(audio_entries, starts)
+    base, _ = os.path.splitext(video_path)
+    if not cues:
+        for stale in (f"{base}.srt", f"{base}.vtt"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        return None
+    write_vtt(cues, f"{base}.vtt")
+    return write_srt(cues, f"{base}.srt")
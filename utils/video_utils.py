@@ -1,113 +1,209 @@
 from utils.avatar_utils import add_avatar_to_slide
+from utils.audio_assembler import assemble_soundtrack
+from utils.audio_utils import audio_entry_from_file
+from utils.slide_raster import SlideRaster, load_rgba, quantize_static
+from utils.subtitle_utils import write_subtitle_sidecars
+import logging
 import os
+import shutil
+import subprocess
 import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 from moviepy.editor import (
     ImageClip, concatenate_videoclips, CompositeVideoClip,
-    AudioFileClip, concatenate_audioclips, ColorClip, vfx
+    AudioFileClip, CompositeAudioClip
 )
 
 VIDEO_W, VIDEO_H = 1280, 720
 TOP_TEXT_HEIGHT = int(VIDEO_H * 0.6)
 BOTTOM_IMAGE_HEIGHT = VIDEO_H - TOP_TEXT_HEIGHT
+# Content image box (3:2, Unsplash's usual landscape ratio); images fetched
+# at exactly this size are blitted without a per-render resize
+SLIDE_IMAGE_SIZE = (330, 220)
+
+# Encoder profiles shared by the single-pass and segmented renders (all
+# segments of a video use one profile, so they join without re-encoding).
+# Constant quality (CRF) instead of a fixed bitrate: static slides need
+# far fewer bits than 2 Mbit/s, and a fast preset skips motion search
+# that mostly-still frames do not need. Plain libx264 runs everywhere.
+VIDEO_CODEC = "libx264"
+ENCODER_PROFILES = {
+    "draft": {
+        "label": "Draft (fast preview)",
+        "crf": 30, "preset": "veryfast", "tune": "stillimage",
+        "keyframe_seconds": 10, "fps": 15,
+    },
+    "standard": {
+        "label": "Standard",
+        "crf": 23, "preset": "fast", "tune": "stillimage",
+        "keyframe_seconds": 4, "fps": 30,
+    },
+    "archive": {
+        "label": "Archive (best quality)",
+        "crf": 18, "preset": "slow", "tune": "animation",
+        "keyframe_seconds": 2, "fps": 30,
+    },
+}
+DEFAULT_ENCODER_PROFILE = os.getenv("BSK_ENCODER_PROFILE", "standard")
+if DEFAULT_ENCODER_PROFILE not in ENCODER_PROFILES:
+    logging.warning(
+        f"[Video] Unknown BSK_ENCODER_PROFILE {DEFAULT_ENCODER_PROFILE!r}, "
+        f"using 'standard' (choices: {', '.join(ENCODER_PROFILES)})"
+    )
+    DEFAULT_ENCODER_PROFILE = "standard"
+
+OUTPUT_DIR = "output_videos"
+
+# Between animations only the avatar moves (a few px/s), so those frames
+# are composited at this rate and repeated in between (0 = always full rate)
+STATIC_FPS = int(os.getenv("BSK_STATIC_FPS", "5"))
+
+SLIDE_TAIL = 0.4  # silence kept after each narration
+CROSSFADE = 0.4  # overlap between consecutive slides (padding=-CROSSFADE)
+FIRST_BULLET_AT = 0.8  # after the title has faded in
+BULLET_STAGGER = 0.5  # fallback spacing when no word timings exist
+BULLET_LEAD = 0.15  # show a bullet just before the narrator reads it
 
 
 # -------------------------------------------------
 # TEXT RENDERING WITH PIL (NO IMAGEMAGICK NEEDED)
 # -------------------------------------------------
-def create_text_image(text, fontsize, color, max_width, font_name="Arial", bold=False):
+FONT_PATHS = {
+    True: [  # bold
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+        "/System/Library/Fonts/Helvetica.ttc",  # macOS
+        "C:/Windows/Fonts/arialbd.ttf",  # Windows
+    ],
+    False: [
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/System/Library/Fonts/Helvetica.ttc",  # macOS
+        "C:/Windows/Fonts/arial.ttf",  # Windows
+    ],
+}
+
+COLOR_MAP = {
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+    "lightgray": (211, 211, 211),
+    "gray": (128, 128, 128),
+}
+
+TEXT_CACHE_SIZE = 512  # distinct rendered strings kept per process
+IMAGE_CACHE_SIZE = 64  # decoded slide images kept per process
+
+# FreeType objects are shared between compose threads
+_text_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def find_font_path(bold=False):
+    """First usable system font path, or None to use PIL's default font."""
+    for path in FONT_PATHS[bool(bold)]:
+        if os.path.exists(path):
+            try:
+                ImageFont.truetype(path, 12)
+                return path
+            except Exception:
+                continue
+    return None
+
+
+@lru_cache(maxsize=64)
+def load_font(path, size):
+    """Loaded font, cached by (path, size)."""
+    if path is None:
+        return ImageFont.load_default()
+    return ImageFont.truetype(path, size)
+
+
+def wrap_text(text, font, max_width):
     """
-    Create a text image using PIL (no ImageMagick required).
-    Returns a temporary file path with the rendered text image.
+    Greedy word wrap using real glyph advances (font.getlength).
+    A single word wider than max_width keeps its own line.
     """
-    # Try to load font, fallback to default if not available
-    try:
-        if bold:
-            # Try bold font
-            font_paths = [
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-                "/System/Library/Fonts/Helvetica.ttc",  # macOS
-                "C:/Windows/Fonts/arialbd.ttf",  # Windows
-            ]
+    lines = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and font.getlength(candidate) > max_width:
+            lines.append(current)
+            current = word
         else:
-            font_paths = [
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                "/System/Library/Fonts/Helvetica.ttc",  # macOS
-                "C:/Windows/Fonts/arial.ttf",  # Windows
-            ]
-        
-        font = None
-        for path in font_paths:
-            if os.path.exists(path):
-                try:
-                    font = ImageFont.truetype(path, fontsize)
-                    break
-                except:
-                    continue
-        
-        if font is None:
-            font = ImageFont.load_default()
-    except:
-        font = ImageFont.load_default()
-    
-    # Parse color
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _render_mask(text, fontsize, max_width, bold):
+    """Glyph coverage (uint8 alpha) of wrapped text, shared by every colour."""
+    with _text_lock:
+        font = load_font(find_font_path(bold), fontsize)
+        lines = wrap_text(text, font, max_width)
+
+        line_height = int(fontsize * 1.2)
+        if lines:
+            last_bottom = font.getbbox(lines[-1])[3]
+            height = (len(lines) - 1) * line_height + last_bottom + 10
+        else:
+            height = 1
+
+        # Canvas sized from measured text, no crop pass
+        img = Image.new("L", (max_width, height), 0)
+        draw = ImageDraw.Draw(img)
+        for i, line in enumerate(lines):
+            draw.text((0, i * line_height), line, fill=255, font=font)
+
+    return np.asarray(img)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _render_text(text, fontsize, rgb_color, max_width, bold):
+    mask = _render_mask(text, fontsize, max_width, bold)
+    pixels = np.empty(mask.shape + (4,), dtype=np.uint8)
+    pixels[..., :3] = rgb_color
+    pixels[..., 3] = mask
+    pixels.flags.writeable = False  # shared between every caller
+    return pixels
+
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _decode_image(path, mtime_ns, height):
+    pixels = load_rgba(path, height=height)
+    pixels.flags.writeable = False  # shared between every caller
+    return pixels
+
+
+def load_slide_image(path, height=None):
+    """
+    Image file as an RGBA array, decoded once per process (in-memory tier
+    over the images/ disk cache). Keyed on mtime: a replaced file is
+    decoded again.
+    """
+    return _decode_image(path, os.stat(path).st_mtime_ns, height)
+
+
+def create_text_image(text, fontsize, color, max_width, font_name="Arial", bold=False):
+    """
+    Render text with PIL (no ImageMagick required).
+    Returns an RGBA NumPy array; identical requests (footer, repeated
+    titles) are rendered once per process and reused, and a shadow copy
+    only re-tints the glyphs of its main copy.
+    """
     if isinstance(color, str):
-        color_map = {
-            "white": (255, 255, 255),
-            "black": (0, 0, 0),
-            "lightgray": (211, 211, 211),
-            "gray": (128, 128, 128),
-        }
-        rgb_color = color_map.get(color.lower(), (255, 255, 255))
+        rgb_color = COLOR_MAP.get(color.lower(), (255, 255, 255))
     else:
-        rgb_color = color
-    
-    # Create image with transparent background
-    # Start with a reasonable size, we'll crop later
-    img = Image.new("RGBA", (max_width, fontsize * 3), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
-    # Word wrap text
-    words = text.split()
-    lines = []
-    current_line = []
-    current_width = 0
-    
-    for word in words:
-        # Estimate width (approximate)
-        word_width = len(word) * fontsize * 0.6
-        if current_width + word_width > max_width and current_line:
-            lines.append(" ".join(current_line))
-            current_line = [word]
-            current_width = word_width
-        else:
-            current_line.append(word)
-            current_width += word_width + fontsize * 0.3
-    
-    if current_line:
-        lines.append(" ".join(current_line))
-    
-    # Draw text
-    y_offset = 0
-    line_height = int(fontsize * 1.2)
-    for line in lines:
-        draw.text((0, y_offset), line, fill=rgb_color, font=font)
-        y_offset += line_height
-    
-    # Crop to actual text size
-    bbox = img.getbbox()
-    if bbox:
-        img = img.crop((0, 0, max_width, bbox[3] + 10))
-    
-    # Save to temporary file
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    img.save(temp_file.name, "PNG")
-    temp_file.close()
-    
-    return temp_file.name
+        rgb_color = tuple(color)
+
+    return _render_text(text, fontsize, rgb_color, max_width, bool(bold))
 
 
 def create_text_clip(text, fontsize, color, max_width, position, start_time, duration, fadein=0, font_name="Arial", bold=False, opacity=1.0):
@@ -115,9 +211,9 @@ def create_text_clip(text, fontsize, color, max_width, position, start_time, dur
     Create a MoviePy ImageClip from PIL-rendered text.
     This replaces TextClip and doesn't require ImageMagick.
     """
-    text_img_path = create_text_image(text, fontsize, color, max_width, font_name, bold)
-    
-    clip = ImageClip(text_img_path)
+    text_img = create_text_image(text, fontsize, color, max_width, font_name, bold)
+
+    clip = ImageClip(text_img)
     clip = clip.set_position(position)
     clip = clip.set_start(start_time)
     clip = clip.set_duration(duration)
@@ -129,176 +225,412 @@ def create_text_clip(text, fontsize, color, max_width, position, start_time, dur
     return clip
 
 
+def text_layer(text, fontsize, color, max_width, bold=False):
+    """
+    Render text to an RGBA array for the slide rasterizer.
+    """
+    return create_text_image(text, fontsize, color, max_width, bold=bold).astype(np.float32)
+
+
+# -------------------------------------------------
+# TIMELINE (FROM THE AUDIO MANIFEST)
+# -------------------------------------------------
+def slide_duration(audio_duration):
+    return audio_duration + SLIDE_TAIL
+
+
+def slide_start_times(audio_entries, overlap=CROSSFADE):
+    """
+    Start time of each slide (and its narration) in the final video.
+    With overlap == SLIDE_TAIL the narrations abut exactly.
+    """
+    starts = []
+    t = 0.0
+    for entry in audio_entries:
+        starts.append(t)
+        t += slide_duration(entry["duration"]) - overlap
+    return starts
+
+
+def bullet_reveal_times(count, bullet_starts=None):
+    """
+    When each bullet appears: as the narrator starts it (from TTS word
+    boundaries), never before the title, never out of order. Falls back
+    to a fixed stagger when timings are missing.
+    """
+    bullet_starts = bullet_starts or []
+    times = []
+    previous = FIRST_BULLET_AT
+    for i in range(count):
+        start = bullet_starts[i] if i < len(bullet_starts) else None
+        if start is None:
+            t = FIRST_BULLET_AT + i * BULLET_STAGGER if not times else previous + BULLET_STAGGER
+        else:
+            t = start - BULLET_LEAD
+        t = max(t, previous)
+        times.append(t)
+        previous = t
+    return times
+
+
 # -------------------------------------------------
 # SLIDE CREATION WITH BETTER ANIMATION
 # -------------------------------------------------
-def create_slide(title, points, image_path, audio_file):
+def create_slide(title, points, image_path, audio):
+    """
+    Build one silent slide clip.
+
+    `audio` is the slide's TTS manifest entry (path, duration, ...), or
+    an MP3 path which is header-probed. Timing comes from the manifest;
+    no decoder is opened here. Narration is mixed in once, for the whole
+    video, by the render stage. Bullets are revealed at the manifest's
+    "bullet_starts" (word-boundary timings) when present.
+    """
+    if isinstance(audio, str):
+        audio = audio_entry_from_file(audio)
+    audio_file = audio["path"]
     if not os.path.exists(audio_file) or os.path.getsize(audio_file) < 1024:
         raise RuntimeError(f"Invalid audio file: {audio_file}")
-    audio_clip = AudioFileClip(audio_file)
-    duration = audio_clip.duration + 0.4  # small buffer
+    duration = slide_duration(audio["duration"])
 
     # -----------------------------
-    # BACKGROUND (soft animated)
+    # BACKGROUND (soft animated) + OVERLAY
     # -----------------------------
-    bg = (
-        ColorClip(size=(VIDEO_W, VIDEO_H), color=(20, 22, 32))
-        .set_duration(duration)
-        .fx(vfx.fadein, 0.4)
-        .fx(vfx.fadeout, 0.4)
-    )
-
-    overlay = (
-        ColorClip(size=(VIDEO_W, VIDEO_H), color=(0, 0, 0))
-        .set_opacity(0.35)
-        .set_duration(duration)
-    )
+    raster = SlideRaster(VIDEO_W, VIDEO_H, background=(20, 22, 32), bg_fade=0.4)
+    raster.add_fill((0, 0, 0), opacity=0.35)
 
     # -----------------------------
     # TITLE (using PIL instead of TextClip)
     # -----------------------------
-    title_clip = create_text_clip(
-        title,
-        fontsize=48,
-        color="white",
-        max_width=VIDEO_W - 120,
-        position=("center", 50),
-        start_time=0.2,
-        duration=duration,
-        fadein=0.6,
-        bold=True
-    )
-
-    title_shadow = create_text_clip(
-        title,
-        fontsize=48,
-        color="black",
-        max_width=VIDEO_W - 120,
+    raster.add_layer(
+        text_layer(title, fontsize=48, color="black", max_width=VIDEO_W - 120, bold=True),
         position=("center", 52),
-        start_time=0.2,
-        duration=duration,
+        start=0.2,
         opacity=0.6,
-        bold=True
+    )
+    raster.add_layer(
+        text_layer(title, fontsize=48, color="white", max_width=VIDEO_W - 120, bold=True),
+        position=("center", 50),
+        start=0.2,
+        fadein=0.6,
     )
 
     # -----------------------------
     # BULLETS (top section only)
     # -----------------------------
-    bullet_clips = []
     start_y = 140
     line_gap = 44
+    reveal_times = bullet_reveal_times(len(points[:5]), audio.get("bullet_starts"))
 
     for i, point in enumerate(points[:5]):
-        appear_time = 0.8 + i * 0.5
+        appear_time = reveal_times[i]
         text = f"• {point.strip()}"
 
-        shadow = create_text_clip(
-            text,
-            fontsize=32,
-            color="black",
-            max_width=VIDEO_W - 200,
+        raster.add_layer(
+            text_layer(text, fontsize=32, color="black", max_width=VIDEO_W - 200),
             position=(102, start_y + i * line_gap + 2),
-            start_time=appear_time,
-            duration=duration - appear_time,
-            opacity=0.5
+            start=appear_time,
+            opacity=0.5,
         )
-
-        bullet = create_text_clip(
-            text,
-            fontsize=32,
-            color="white",
-            max_width=VIDEO_W - 200,
+        raster.add_layer(
+            text_layer(text, fontsize=32, color="white", max_width=VIDEO_W - 200),
             position=(100, start_y + i * line_gap),
-            start_time=appear_time,
-            duration=duration - appear_time,
-            fadein=0.4
+            start=appear_time,
+            fadein=0.4,
         )
 
-        bullet_clips.extend([shadow, bullet])
-
-
     # -----------------------------
     # CONTENT IMAGE (BOTTOM-RIGHT, STATIC)
     # -----------------------------
-    image_clips = []
     if os.path.exists(image_path):
-        img = (
-            ImageClip(image_path)
-            .resize(height=220)  # fixed, clean size
-            .set_position((
+        raster.add_layer(
+            load_slide_image(image_path, height=SLIDE_IMAGE_SIZE[1]),  # fixed, clean size
+            position=(
                 VIDEO_W - 260,    # right margin
                 VIDEO_H - 260     # bottom margin
-            ))
-            .set_duration(duration)
+            ),
         )
 
-        image_clips.append(img)
-
-
     # -----------------------------
     # FOOTER
     # -----------------------------
-    footer = create_text_clip(
-        "Bangla Sahayta Kendra • Government of West Bengal",
-        fontsize=18,
-        color="lightgray",
-        max_width=VIDEO_W - 80,
+    raster.add_layer(
+        text_layer(
+            "Bangla Sahayta Kendra • Government of West Bengal",
+            fontsize=18,
+            color="lightgray",
+            max_width=VIDEO_W - 80,
+        ),
         position=("center", VIDEO_H - 40),
-        start_time=0,
-        duration=duration
     )
 
-    slide = CompositeVideoClip(
-        [bg, overlay, title_shadow, title_clip]
-        + bullet_clips
-        + image_clips
-        + [footer],
-        size=(VIDEO_W, VIDEO_H)
-    ).set_duration(duration)
-
-    slide = slide.set_audio(audio_clip)
+    # One pre-flattened clip instead of ~15 composited layers
+    slide = raster.to_clip(duration)
 
     # -----------------------------
     # AVATAR (kept intact)
     # -----------------------------
-    slide = add_avatar_to_slide(slide, audio_clip.duration)
+    slide = add_avatar_to_slide(slide, audio["duration"])
+
+    # -----------------------------
+    # REDUCED RATE WHILE NOTHING ANIMATES
+    # -----------------------------
+    if STATIC_FPS > 0:
+        spans = raster.dynamic_intervals(duration)
+        spans += [(0.0, CROSSFADE), (duration - CROSSFADE, duration)]
+        slide = quantize_static(slide, spans, STATIC_FPS)
+
+    return slide.crossfadein(CROSSFADE).crossfadeout(CROSSFADE)
+
+
+# -------------------------------------------------
+# COMPOSITION STATS (REGRESSION GUARD)
+# -------------------------------------------------
+def slide_composition_stats(clip):
+    """
+    Count what a composed slide costs per frame:
+    - layers: leaf clips blended by CompositeVideoClip
+    - audio_readers: distinct AudioFileClip decoders feeding the clip
+    """
+
+    def count_layers(c):
+        if isinstance(c, CompositeVideoClip):
+            return sum(count_layers(child) for child in c.clips)
+        return 1
+
+    readers = set()
+
+    def collect_readers(audio):
+        if audio is None:
+            return
+        if isinstance(audio, CompositeAudioClip):
+            for child in audio.clips:
+                collect_readers(child)
+        elif isinstance(audio, AudioFileClip):
+            readers.add(id(audio.reader))
+
+    collect_readers(clip.audio)
+
+    return {"layers": count_layers(clip), "audio_readers": len(readers)}
+
+
+# -------------------------------------------------
+# OUTPUT NAMING
+# -------------------------------------------------
+def output_video_path(service_name=None):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    filename = "bsk_training_video.mp4"
+    if service_name:
+        safe = service_name.replace(" ", "_")
+        filename = f"BSK_Training_{safe}.mp4"
+
+    return os.path.join(OUTPUT_DIR, filename)
+
+
+# -------------------------------------------------
+# ENCODER PROFILES
+# -------------------------------------------------
+def encoder_settings(profile=None):
+    """
+    write_videofile() arguments for a named profile (None → default).
+    Unknown names raise ValueError.
+    """
+    name = profile or DEFAULT_ENCODER_PROFILE
+    if name not in ENCODER_PROFILES:
+        raise ValueError(
+            f"Unknown encoder profile '{name}' (choose from {', '.join(ENCODER_PROFILES)})"
+        )
+    p = ENCODER_PROFILES[name]
+    return {
+        "codec": VIDEO_CODEC,
+        "fps": p["fps"],
+        "preset": p["preset"],
+        "ffmpeg_params": [
+            "-crf", str(p["crf"]),
+            "-tune", p["tune"],
+            "-g", str(p["keyframe_seconds"] * p["fps"]),  # GOP length in frames
+            "-pix_fmt", "yuv420p",
+        ],
+    }
+
 
-    return slide.crossfadein(0.4).crossfadeout(0.4)
+def encoder_profile_labels():
+    """{profile name: UI label} in display order."""
+    return {name: p["label"] for name, p in ENCODER_PROFILES.items()}
 
 
 # -------------------------------------------------
 # COMBINE SLIDES (NO BLACK GAPS)
 # -------------------------------------------------
-def combine_slides_and_audio(video_clips, audio_paths, service_name=None):
+def _soundtrack_path(workspace):
+    if workspace is not None:
+        return workspace.new_file(".m4a", kind="audio")
+    fd, path = tempfile.mkstemp(suffix=".m4a", prefix="bsk_soundtrack_")
+    os.close(fd)
+    return path
+
+
+def combine_slides_and_audio(
+    video_clips, audio_entries, service_name=None, workspace=None,
+    profile=None, output_path=None,
+):
+    """
+    Concatenate composed (silent) slides, assemble the narration once
+    from the audio manifest, and mux it into a single video encode.
+    The soundtrack goes to `workspace` when given; `profile` names an
+    ENCODER_PROFILES entry; `output_path` overrides the output naming.
+    """
+    settings = encoder_settings(profile)
     # Smooth overlap between slides
     final_video = concatenate_videoclips(
         video_clips,
         method="compose",
-        padding=-0.4
+        padding=-CROSSFADE
     )
 
-    audio_clips = [AudioFileClip(p) for p in audio_paths]
-    final_audio = concatenate_audioclips(audio_clips)
+    starts = slide_start_times(audio_entries)
+    output_path = output_path or output_video_path(service_name)
 
-    final_video = final_video.set_audio(final_audio)
+    # Subtitles come from the same manifest timings, no alignment pass
+    write_subtitle_sidecars(output_path, audio_entries, starts)
 
-    os.makedirs("output_videos", exist_ok=True)
+    soundtrack = assemble_soundtrack(
+        audio_entries, starts, final_video.duration, _soundtrack_path(workspace)
+    )
+    try:
+        if workspace is not None:
+            workspace.commit(soundtrack, kind="audio")
+
+        # audio=<file>: MoviePy stream-copies the AAC track, no re-encode
+        final_video.write_videofile(
+            output_path,
+            audio=soundtrack,
+            threads=4,
+            **settings,
+        )
+    finally:
+        if workspace is None:
+            os.remove(soundtrack)
 
-    filename = "bsk_training_video.mp4"
-    if service_name:
-        safe = service_name.replace(" ", "_")
-        filename = f"BSK_Training_{safe}.mp4"
+    return output_path
 
-    output_path = os.path.join("output_videos", filename)
 
-    final_video.write_videofile(
-        output_path,
-        codec="libx264",
-        audio_codec="aac",
-        fps=30,
-        preset="medium",
-        bitrate="2000k",
-        threads=4
+# -------------------------------------------------
+# SEGMENTED RENDER (ONE PROCESS PER SLIDE)
+# -------------------------------------------------
+def _render_segment(spec, segment_path, profile=None):
+    """
+    Process-pool worker: rebuild one slide from its assets and encode it.
+    MoviePy clips hold lambdas and open readers, so they cannot be pickled;
+    only the plain slide spec crosses the process boundary.
+    """
+    audio = spec.get("tts") or spec["audio"]
+    clip = create_slide(spec["title"], spec["bullets"], spec["image"], audio)
+
+    # Video only: the soundtrack is assembled once and muxed at concat
+    clip.write_videofile(
+        segment_path,
+        audio=False,
+        threads=1,  # parallelism comes from the pool
+        logger=None,
+        **encoder_settings(profile),
     )
+    clip.close()
+
+    return segment_path
+
+
+def concat_segments(segment_paths, output_path, audio_path=None):
+    """
+    Join MP4 segments with ffmpeg's concat demuxer (stream copy, no re-encode).
+    When `audio_path` is given its track is muxed in (also stream copy).
+    """
+    from moviepy.config import get_setting
+
+    list_path = os.path.join(os.path.dirname(segment_paths[0]), "segments.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+    ]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v", "-map", "1:a"]
+    cmd += ["-c", "copy", "-movflags", "+faststart", output_path]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Segment concat failed: {result.stderr.strip()}")
+
+    return output_path
+
+
+def render_segmented_video(
+    slide_specs, service_name=None, workers=None, workspace=None, profile=None
+):
+    """
+    Encode each slide in its own worker process, then stream-copy concat.
+
+    Input:
+    - slide_specs: dicts with title, bullets, image, audio and the
+      "tts" manifest entry (as returned by utils.pipeline.run_slide_pipeline)
+    - workspace: optional JobWorkspace that holds the segments
+    - profile: ENCODER_PROFILES name (default: DEFAULT_ENCODER_PROFILE)
+    Output:
+    - path to the final MP4
+
+    Slides are joined back to back, so the 0.4s cross-dissolve of the
+    single-pass render becomes a fade through black at each cut.
+    """
+    if not slide_specs:
+        raise ValueError("No slides to render")
+    encoder_settings(profile)  # reject unknown names before spawning workers
+
+    output_path = output_video_path(service_name)
+    if workspace is not None:
+        segment_dir = workspace.subdir("segments")
+    else:
+        segment_dir = tempfile.mkdtemp(prefix="bsk_segments_")
+    segment_paths = [
+        os.path.join(segment_dir, f"segment_{i:03d}.mp4")
+        for i in range(len(slide_specs))
+    ]
+
+    workers = workers or min(len(slide_specs), os.cpu_count() or 1)
+
+    try:
+        # spawn: the Streamlit server is multi-threaded, forking it is unsafe
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            list(pool.map(
+                _render_segment, slide_specs, segment_paths, [profile] * len(slide_specs)
+            ))
+
+        if workspace is not None:
+            for path in segment_paths:
+                workspace.commit(path, kind="segment")
+
+        # Segments abut, so each slide starts where the previous one ended
+        entries = [
+            spec.get("tts") or audio_entry_from_file(spec["audio"])
+            for spec in slide_specs
+        ]
+        starts = slide_start_times(entries, overlap=0)
+        total = starts[-1] + slide_duration(entries[-1]["duration"])
+
+        soundtrack = assemble_soundtrack(
+            entries, starts, total, os.path.join(segment_dir, "soundtrack.m4a")
+        )
+        if workspace is not None:
+            workspace.commit(soundtrack, kind="audio")
+
+        concat_segments(segment_paths, output_path, audio_path=soundtrack)
+        write_subtitle_sidecars(output_path, entries, starts)
+    finally:
+        if workspace is None:
+            shutil.rmtree(segment_dir, ignore_errors=True)
 
     return output_path
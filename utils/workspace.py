@@ -0,0 +1,157 @@
+"""
+Per-job scratch workspace
+
+Goals:
+- Every temporary artifact of a job lives in ONE directory
+- Deterministic cleanup on success or failure
+- Size quota so a runaway job cannot fill /tmp
+- Bytes-written metrics per job
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+WORKSPACE_ROOT = os.getenv("BSK_WORKSPACE_ROOT") or tempfile.gettempdir()
+WORKSPACE_QUOTA_MB = int(os.getenv("BSK_WORKSPACE_QUOTA_MB", "2048"))
+
+
+class WorkspaceQuotaExceeded(RuntimeError):
+    """Raised when a job writes more scratch data than its quota allows."""
+
+
+# -------------------------------------------------
+# WORKSPACE
+# -------------------------------------------------
+class JobWorkspace:
+    """
+    Scratch directory for one generation job.
+
+    Usage:
+        with JobWorkspace("video") as ws:
+            path = ws.new_file(".mp3", kind="audio")
+            ... write path ...
+            ws.commit(path)
+
+    The directory is removed when the block exits, whether the job
+    succeeded or raised.
+    """
+
+    def __init__(self, job_name="job", quota_mb=None, root=None):
+        self.job_name = job_name
+        self.job_id = uuid.uuid4().hex[:12]
+        self.quota_bytes = int((quota_mb or WORKSPACE_QUOTA_MB) * 1024 * 1024)
+
+        root = root or WORKSPACE_ROOT
+        os.makedirs(root, exist_ok=True)
+        self.root = tempfile.mkdtemp(prefix=f"bsk_{job_name}_{self.job_id}_", dir=root)
+
+        self._lock = threading.Lock()
+        self._artifacts = {}  # path -> (kind, bytes)
+        self._counter = 0
+        self._started = time.time()
+        self.closed = False
+
+    # -----------------------------
+    # CONTEXT MANAGER
+    # -----------------------------
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics = self.metrics()
+        self.cleanup()
+        logging.info(
+            f"[Workspace] {self.job_name} {self.job_id}: "
+            f"{metrics['files']} files, {metrics['bytes_written']} bytes "
+            f"({'failed' if exc_type else 'ok'})"
+        )
+        return False
+
+    # -----------------------------
+    # ARTIFACTS
+    # -----------------------------
+    def new_file(self, suffix="", kind="misc"):
+        """Reserve a unique path inside the workspace."""
+        with self._lock:
+            self._counter += 1
+            name = f"{kind}_{self._counter:04d}{suffix}"
+        path = os.path.join(self.root, name)
+        with self._lock:
+            self._artifacts[path] = (kind, 0)
+        return path
+
+    def subdir(self, name):
+        """Create (or reuse) a sub-directory inside the workspace."""
+        path = os.path.join(self.root, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def reserve(self, nbytes):
+        """
+        Enforce the quota before writing `nbytes` more (when the size is
+        known up front, e.g. an upload or a file copy).
+        """
+        total = self.bytes_written + nbytes
+        if total > self.quota_bytes:
+            raise WorkspaceQuotaExceeded(
+                f"Job {self.job_id} would write {total} bytes "
+                f"(quota {self.quota_bytes} bytes)"
+            )
+
+    def commit(self, path, kind=None):
+        """
+        Record the size of a written artifact and enforce the quota.
+        Returns the path for convenient chaining.
+
+        Streamed outputs (TTS, ffmpeg) have no size until they are
+        written, so this check runs afterwards: without a reserve() the
+        last file can take a job past its quota by that file's size.
+        """
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        with self._lock:
+            old_kind, _ = self._artifacts.get(path, (kind or "misc", 0))
+            self._artifacts[path] = (kind or old_kind, size)
+            total = sum(b for _, b in self._artifacts.values())
+
+        if total > self.quota_bytes:
+            raise WorkspaceQuotaExceeded(
+                f"Job {self.job_id} wrote {total} bytes "
+                f"(quota {self.quota_bytes} bytes)"
+            )
+        return path
+
+    # -----------------------------
+    # METRICS / CLEANUP
+    # -----------------------------
+    @property
+    def bytes_written(self):
+        with self._lock:
+            return sum(b for _, b in self._artifacts.values())
+
+    def metrics(self):
+        with self._lock:
+            by_kind = {}
+            for kind, size in self._artifacts.values():
+                by_kind[kind] = by_kind.get(kind, 0) + size
+            return {
+                "job_id": self.job_id,
+                "files": len(self._artifacts),
+                "bytes_written": sum(by_kind.values()),
+                "bytes_by_kind": by_kind,
+                "quota_bytes": self.quota_bytes,
+                "elapsed_s": round(time.time() - self._started, 2),
+            }
+
+    def cleanup(self):
+        if self.closed:
+            return
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.closed = True
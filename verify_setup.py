@@ -18,6 +18,9 @@ def check_environment():
         "GOOGLE_API_KEY": "Google Gemini API key",
         "UNSPLASH_ACCESS_KEY": "Unsplash API access key"
     }
+    # Offline image library mode never calls Unsplash
+    if os.getenv("BSK_IMAGE_SOURCE", "auto").lower() == "library":
+        del required_vars["UNSPLASH_ACCESS_KEY"]
     
     for var, description in required_vars.items():
         value = os.getenv(var)